@@ -1,13 +1,31 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from api.executor import shutdown_executor
+from api.jobs import job_queue
 from api.routes import router
+from extractors.ocr import init_backend
+from utils.metrics import REQUEST_SECONDS, REQUESTS, RESPONSE_BYTES
 
 from fastapi.middleware.cors import CORSMiddleware
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tesserocr must be imported on the main thread, not in a worker thread
+    init_backend()
+    job_queue.start()
+    yield
+    # Let in-flight extractions finish before the worker exits
+    job_queue.stop()
+    shutdown_executor()
+
+
 app = FastAPI(
     title="Text Extraction API",
     description="A REST API for extracting text from various document formats.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -31,6 +49,21 @@ app.add_middleware(
 app.include_router(router)
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, so per-job URLs do not each get a series
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    REQUESTS.inc(1, path, str(response.status_code))
+    REQUEST_SECONDS.observe(time.perf_counter() - started, path)
+    content_length = response.headers.get("content-length")
+    if content_length:
+        RESPONSE_BYTES.inc(int(content_length), path)
+    return response
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.file_utils import IMAGE_EXTENSIONS, get_file_extension
+from utils.resources import process_rss
+
+logger = logging.getLogger("TextExtractor")
+
+# Number of extraction jobs the API runs at once, independent of the event loop
+MAX_WORKERS = int(
+    os.environ.get("EXTRACTION_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+)
+
+# "thread", "process" or "hybrid" (OCR work in processes, the rest in threads)
+EXTRACTION_BACKEND = os.environ.get("EXTRACTION_BACKEND", "thread")
+
+BACKENDS = ["thread", "process", "hybrid"]
+
+# Limits of a single job in a worker process; 0 disables a limit. Threads
+# cannot be stopped, so jobs run in threads are not limited.
+JOB_MEMORY_LIMIT_BYTES = int(
+    os.environ.get("JOB_MEMORY_LIMIT_BYTES", 2 * 1024 * 1024 * 1024)
+)
+JOB_TIME_LIMIT_SECONDS = float(os.environ.get("JOB_TIME_LIMIT_SECONDS", 600))
+# Seconds a job has to unwind once interrupted before its worker is killed
+JOB_KILL_GRACE_SECONDS = float(os.environ.get("JOB_KILL_GRACE_SECONDS", 5))
+# CPU seconds after which the kernel kills a worker whose job is stuck in
+# native code that never lets the watchdog run
+JOB_CPU_LIMIT_SECONDS = float(
+    os.environ.get("JOB_CPU_LIMIT_SECONDS", 2 * JOB_TIME_LIMIT_SECONDS)
+)
+
+WATCHDOG_INTERVAL = 0.25
+
+_executor = None
+
+# The job running in this worker process, as its start time, and the job
+# interrupted for going over a limit; only used inside worker processes
+_job_started = None
+_interrupted = None
+
+
+class JobLimitExceeded(Exception):
+    """Raised in a job that went over the per-job memory or time limit."""
+
+    def __init__(self, reason):
+        super().__init__(f"Extraction exceeded the {reason} limit")
+        self.reason = reason
+
+    def __reduce__(self):
+        return JobLimitExceeded, (self.reason,)
+
+
+def _interrupt_job(signum, frame):
+    """SIGALRM handler: stop the job if it is still the one interrupted."""
+    interrupted = _interrupted
+    if interrupted is not None and interrupted[0] == _job_started:
+        raise JobLimitExceeded(interrupted[1])
+
+
+def _watch_job():
+    """
+    Stop the job of this worker process once it goes over a limit.
+
+    The job is first interrupted with SIGALRM, which raises
+    JobLimitExceeded in it; a job stuck in native code past the grace
+    period gets its worker killed.
+    """
+    global _interrupted
+    while True:
+        time.sleep(WATCHDOG_INTERVAL)
+        started = _job_started
+        if started is None:
+            continue
+
+        interrupted = _interrupted
+        if interrupted is not None and interrupted[0] == started:
+            if time.monotonic() - interrupted[2] > JOB_KILL_GRACE_SECONDS:
+                logger.error(f"Killing worker {os.getpid()}: job did not stop")
+                os._exit(1)
+            continue
+
+        reason = None
+        elapsed = time.monotonic() - started
+        if JOB_TIME_LIMIT_SECONDS and elapsed > JOB_TIME_LIMIT_SECONDS:
+            reason = "time"
+        elif JOB_MEMORY_LIMIT_BYTES and (process_rss() or 0) > JOB_MEMORY_LIMIT_BYTES:
+            reason = "memory"
+        if reason:
+            logger.warning(f"Stopping a job in worker {os.getpid()}: {reason} limit")
+            _interrupted = (started, reason, time.monotonic())
+            os.kill(os.getpid(), signal.SIGALRM)
+
+
+def _run_guarded(fn, /, *args, **kwargs):
+    """Run a job in a worker process under the per-job limits."""
+    global _job_started
+    if JOB_CPU_LIMIT_SECONDS:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_seconds = usage.ru_utime + usage.ru_stime
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        # SIGXCPU, which kills the process, is sent once the job used its share
+        resource.setrlimit(
+            resource.RLIMIT_CPU, (int(cpu_seconds + JOB_CPU_LIMIT_SECONDS) + 1, hard)
+        )
+    started = _job_started = time.monotonic()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _job_started = None
+        if JOB_CPU_LIMIT_SECONDS:
+            resource.setrlimit(resource.RLIMIT_CPU, (resource.RLIM_INFINITY, hard))
+        interrupted = _interrupted
+        if interrupted is not None and interrupted[0] == started:
+            # Extractors turn the interruption into an error result of their
+            # own; report it as what it was
+            raise JobLimitExceeded(interrupted[1])
+
+
+def _start_watchdog():
+    """Install the job interrupt handler and watchdog in a worker process."""
+    if not (JOB_MEMORY_LIMIT_BYTES or JOB_TIME_LIMIT_SECONDS):
+        return
+    signal.signal(signal.SIGALRM, _interrupt_job)
+    threading.Thread(target=_watch_job, name="job-watchdog", daemon=True).start()
+
+
+def _warm_worker():
+    """Import the extractors and their parsing libraries when a worker starts."""
+    _start_watchdog()
+    import api.start  # noqa: F401
+    from extractors.registry import load_all
+
+    load_all()
+    # tesserocr must be imported on the worker's main thread
+    from extractors.ocr import init_backend
+
+    init_backend()
+    # Imported by the extractors on first use only
+    import fitz  # noqa: F401
+    import PyPDF2  # noqa: F401
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def _is_ocr_job(source, *args, enable_ocr=False, filename=None, **kwargs):
+    """Guess whether an extraction job is dominated by CPU-bound OCR work."""
+    return enable_ocr or get_file_extension(filename or source) in IMAGE_EXTENSIONS
+
+
+def _process_pool(max_workers):
+    # Spawn keeps workers independent of the threads running in the parent
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_worker,
+    )
+
+
+class GuardedProcessPool(Executor):
+    """
+    A process pool whose jobs run under the per-job memory and time limits.
+
+    A worker killed for a runaway job breaks a ProcessPoolExecutor for good,
+    so the pool is replaced by a fresh one on the next submit.
+    """
+
+    def __init__(self, max_workers=None):
+        self._max_workers = max_workers
+        self._pool = _process_pool(max_workers)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            try:
+                return self._pool.submit(_run_guarded, fn, *args, **kwargs)
+            except BrokenProcessPool:
+                logger.warning("Replacing a process pool after a worker was killed")
+                self._pool.shutdown(wait=False)
+                self._pool = _process_pool(self._max_workers)
+                return self._pool.submit(_run_guarded, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+class HybridExecutor(Executor):
+    """
+    Route OCR-heavy jobs to warm worker processes and everything else to threads.
+
+    Jobs are submitted as ``submit(fn, source, ..., enable_ocr=...)``, with
+    ``filename=...`` when the source is not a path; ``is_cpu_bound``
+    receives the same arguments and picks the pool.
+    """
+
+    def __init__(self, max_workers=None, is_cpu_bound=_is_ocr_job):
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="extractor"
+        )
+        self._processes = GuardedProcessPool(max_workers)
+        self._is_cpu_bound = is_cpu_bound
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self._is_cpu_bound(*args, **kwargs):
+            return self._processes.submit(fn, *args, **kwargs)
+        return self._threads.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self._processes.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def create_executor(backend="thread", max_workers=None):
+    """Create an executor for the given extraction backend."""
+    if backend == "thread":
+        return ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="extractor"
+        )
+    elif backend == "process":
+        return GuardedProcessPool(max_workers)
+    elif backend == "hybrid":
+        return HybridExecutor(max_workers)
+    raise ValueError(
+        f"Unsupported backend: {backend}. Expected one of {', '.join(BACKENDS)}"
+    )
+
+
+def get_executor():
+    """Return the shared executor used for blocking extraction work."""
+    global _executor
+    if _executor is None:
+        _executor = create_executor(EXTRACTION_BACKEND, MAX_WORKERS)
+    return _executor
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """Run a blocking function on the shared executor and await its result."""
+    return await asyncio.wrap_future(get_executor().submit(func, *args, **kwargs))
+
+
+def shutdown_executor(wait=True):
+    """Shut down the shared executor, if it was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
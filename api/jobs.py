@@ -0,0 +1,355 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from api.executor import get_executor
+from api.start import record_extraction, submit_extraction
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "jobs/jobs.sqlite3")
+JOBS_UPLOAD_DIR = os.environ.get("JOBS_UPLOAD_DIR", "jobs/uploads")
+# Worker threads draining the queue in this process
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", os.cpu_count() or 1))
+# Queued files above which new jobs are rejected with 429
+JOBS_MAX_QUEUED_FILES = int(os.environ.get("JOBS_MAX_QUEUED_FILES", 1000))
+# Unfinished jobs a single client may have
+JOBS_MAX_ACTIVE_PER_CLIENT = int(os.environ.get("JOBS_MAX_ACTIVE_PER_CLIENT", 10))
+# Files of a single client extracted at the same time
+JOBS_MAX_RUNNING_PER_CLIENT = int(os.environ.get("JOBS_MAX_RUNNING_PER_CLIENT", 2))
+# Finished jobs are deleted after this many seconds
+JOBS_RETENTION_SECONDS = int(os.environ.get("JOBS_RETENTION_SECONDS", 24 * 3600))
+
+POLL_INTERVAL = 0.5
+
+FINISHED_FILE_STATUSES = ("done", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    enable_ocr INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    extracted_text TEXT,
+    status_code INTEGER,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS job_files_status ON job_files(status, id);
+CREATE INDEX IF NOT EXISTS job_files_job ON job_files(job_id);
+CREATE INDEX IF NOT EXISTS jobs_client ON jobs(client_id, status);
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when the queue has no room for another job."""
+
+
+class ClientLimitError(Exception):
+    """Raised when a client already has too many unfinished jobs."""
+
+
+class JobQueue:
+    """
+    Persistent extraction job queue backed by SQLite.
+
+    Jobs and their files are stored in the database, so queued work survives
+    a restart; a pool of worker threads claims queued files one at a time
+    and runs them on the shared extraction executor.
+    """
+
+    def __init__(
+        self,
+        db_path=JOBS_DB_PATH,
+        upload_dir=JOBS_UPLOAD_DIR,
+        workers=JOBS_WORKERS,
+        max_queued_files=JOBS_MAX_QUEUED_FILES,
+        max_active_per_client=JOBS_MAX_ACTIVE_PER_CLIENT,
+        max_running_per_client=JOBS_MAX_RUNNING_PER_CLIENT,
+        retention_seconds=JOBS_RETENTION_SECONDS,
+    ):
+        self.db_path = Path(db_path)
+        self.upload_dir = Path(upload_dir)
+        self.workers = workers
+        self.max_queued_files = max_queued_files
+        self.max_active_per_client = max_active_per_client
+        self.max_running_per_client = max_running_per_client
+        self.retention_seconds = retention_seconds
+        self._threads = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Condition()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def start(self):
+        """Create the database and start the worker threads."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(SCHEMA)
+            # Files that were running when the process stopped are queued again
+            connection.execute(
+                "UPDATE job_files SET status = 'queued' WHERE status = 'running'"
+            )
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads after their current file."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def job_dir(self, job_id):
+        """Return the directory holding a job's uploaded files."""
+        return self.upload_dir / job_id
+
+    def new_job_id(self):
+        """Return a fresh, unguessable job id."""
+        return uuid.uuid4().hex
+
+    def check_capacity(self, client_id, file_count):
+        """Raise if a job of file_count files cannot be accepted right now."""
+        with closing(self._connect()) as connection:
+            self._check_capacity(connection, client_id, file_count)
+
+    def _check_capacity(self, connection, client_id, file_count):
+        queued = connection.execute(
+            "SELECT COUNT(*) FROM job_files WHERE status = 'queued'"
+        ).fetchone()[0]
+        if queued + file_count > self.max_queued_files:
+            raise QueueFullError("Job queue is full, retry later")
+        active = connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE client_id = ? "
+            "AND status IN ('queued', 'running')",
+            (client_id,),
+        ).fetchone()[0]
+        if active >= self.max_active_per_client:
+            raise ClientLimitError("Too many unfinished jobs for this client")
+
+    def submit(self, job_id, client_id, enable_ocr, files):
+        """
+        Queue a job whose files have been saved under job_dir(job_id).
+
+        ``files`` is a list of (filename, path) pairs.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._check_capacity(connection, client_id, len(files))
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute(
+                "INSERT INTO jobs (id, client_id, status, enable_ocr, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, client_id, int(enable_ocr), now),
+            )
+            connection.executemany(
+                "INSERT INTO job_files (job_id, filename, path, status) "
+                "VALUES (?, ?, ?, 'queued')",
+                [(job_id, filename, str(path)) for filename, path in files],
+            )
+            connection.execute("COMMIT")
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def get(self, job_id):
+        """Return a job with the status and results of its files, or None."""
+        with closing(self._connect()) as connection:
+            job = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            files = connection.execute(
+                "SELECT id, filename, status, extracted_text, status_code "
+                "FROM job_files WHERE job_id = ? ORDER BY id",
+                (job_id,),
+            ).fetchall()
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "enable_ocr": bool(job["enable_ocr"]),
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+            "files": [_file_result(row) for row in files],
+        }
+
+    def finished_files(self, job_id, exclude_ids=()):
+        """Return the finished files of a job not in exclude_ids, oldest first."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT id, filename, status, extracted_text, status_code "
+                "FROM job_files WHERE job_id = ? AND status IN (?, ?, ?) "
+                "ORDER BY finished_at, id",
+                (job_id, *FINISHED_FILE_STATUSES),
+            ).fetchall()
+        return [
+            dict(_file_result(row), id=row["id"])
+            for row in rows
+            if row["id"] not in exclude_ids
+        ]
+
+    def cancel(self, job_id):
+        """Cancel a job; files already being extracted are allowed to finish."""
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            updated = connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (now, job_id),
+            ).rowcount
+            connection.execute(
+                "UPDATE job_files SET status = 'cancelled', finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            running = connection.execute(
+                "SELECT COUNT(*) FROM job_files WHERE job_id = ? "
+                "AND status = 'running'",
+                (job_id,),
+            ).fetchone()[0]
+            connection.execute("COMMIT")
+        if updated and not running:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return bool(updated)
+
+    def _claim(self):
+        """Mark the next eligible queued file as running and return it."""
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                """
+                SELECT f.id, f.job_id, f.path, j.enable_ocr
+                FROM job_files f JOIN jobs j ON j.id = f.job_id
+                WHERE f.status = 'queued'
+                  AND (
+                    SELECT COUNT(*) FROM job_files r JOIN jobs rj ON rj.id = r.job_id
+                    WHERE r.status = 'running' AND rj.client_id = j.client_id
+                  ) < ?
+                ORDER BY f.id
+                LIMIT 1
+                """,
+                (self.max_running_per_client,),
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE job_files SET status = 'running' WHERE id = ?",
+                    (row["id"],),
+                )
+                connection.execute(
+                    "UPDATE jobs SET status = 'running' "
+                    "WHERE id = ? AND status = 'queued'",
+                    (row["job_id"],),
+                )
+            connection.execute("COMMIT")
+        return row
+
+    def _finish(self, file_id, job_id, extracted_text, status_code):
+        now = time.time()
+        status = "done" if status_code == 200 else "failed"
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE job_files SET status = ?, extracted_text = ?, "
+                "status_code = ?, finished_at = ? WHERE id = ?",
+                (status, extracted_text, status_code, now, file_id),
+            )
+            remaining = connection.execute(
+                "SELECT COUNT(*) FROM job_files WHERE job_id = ? "
+                "AND status IN ('queued', 'running')",
+                (job_id,),
+            ).fetchone()[0]
+            if not remaining:
+                connection.execute(
+                    "UPDATE jobs SET status = 'done', finished_at = ? "
+                    "WHERE id = ? AND status = 'running'",
+                    (now, job_id),
+                )
+            connection.execute("COMMIT")
+        if not remaining:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def purge_expired(self):
+        """Delete finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        with closing(self._connect()) as connection:
+            expired = [
+                row["id"]
+                for row in connection.execute(
+                    "SELECT id FROM jobs WHERE finished_at < ?", (cutoff,)
+                )
+            ]
+            for job_id in expired:
+                connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def _work(self):
+        last_purge = 0
+        while not self._stopping.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Error claiming job file: {e}")
+                row = None
+
+            if row is None:
+                if time.time() - last_purge > POLL_INTERVAL * 100:
+                    self.purge_expired()
+                    last_purge = time.time()
+                with self._wakeup:
+                    self._wakeup.wait(POLL_INTERVAL)
+                continue
+
+            try:
+                future, coalesced = submit_extraction(
+                    get_executor(), row["path"], bool(row["enable_ocr"])
+                )
+                result, status_code = future.result()
+                record_extraction(row["path"], None, result, status_code, coalesced)
+                extracted_text = result.text if status_code == 200 else result
+            except Exception as e:
+                logger.error(f"Error processing {row['path']}: {e}")
+                extracted_text, status_code = f"Error processing file: {e}", 500
+            self._finish(row["id"], row["job_id"], extracted_text, status_code)
+
+
+def _file_result(row):
+    return {
+        "filename": row["filename"],
+        "status": row["status"],
+        "extracted_text": row["extracted_text"],
+        "status_code": row["status_code"],
+    }
+
+
+job_queue = JobQueue()
@@ -1,15 +1,46 @@
+import asyncio
 import json
+import shutil
+import tempfile
+import time
 from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
-from pathlib import Path
+from fastapi.responses import (
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+from api.executor import BACKENDS, EXTRACTION_BACKEND, get_executor
+from api.jobs import (
+    FINISHED_FILE_STATUSES,
+    POLL_INTERVAL,
+    ClientLimitError,
+    QueueFullError,
+    job_queue,
+)
 from api.start import (
-    SUPPORTED_EXTENSIONS,
-    extract_text as extract_text_from_file,
+    extraction_cache,
     extract_text_from_files,
+    iter_extract_text_cached,
+    record_extraction,
+    submit_extraction,
 )
-from utils.create_ppts import create_pptx_from_flashcards, styles
-from utils.file_utils import get_file_extension
-from io import BytesIO
+from extractors.cost import estimate_cost
+from extractors.ocr import ocr_cache
+from extractors.limits import ExtractionLimits
+from extractors.ocr_plan import ocr_plan_totals
+from extractors.registry import get_extractor, resolve_filename, supported_extensions
+from extractors.sniff import SNIFF_BYTES, inspect_source, sniff_prefix
+from utils.file_utils import (
+    BATCH_IN_MEMORY_UPLOAD_BYTES,
+    IN_MEMORY_UPLOAD_BYTES,
+    UPLOAD_CHUNK_SIZE,
+    read_upload_file,
+    remove_upload_file,
+    save_upload_file,
+)
+from utils.metrics import STAGE_SECONDS, render
 
 router = APIRouter()
 
@@ -20,42 +51,229 @@ async def supported_file_types():
     """
     Get a list of supported file types.
     """
-    return {"supported_file_types": SUPPORTED_EXTENSIONS}
+    return {"supported_file_types": supported_extensions()}
+
+
+# cache counters
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Get hit, miss and eviction counters of the extraction and OCR caches.
+    """
+    return {"extraction": extraction_cache.stats(), "ocr": ocr_cache.stats()}
+
+
+# OCR planning counters
+@router.get("/ocr/stats")
+async def ocr_stats():
+    """
+    Get the number of OCR calls made and skipped by the OCR planner.
+    """
+    return ocr_plan_totals()
+
+
+# Prometheus metrics
+@router.get("/metrics")
+async def metrics():
+    """
+    Get request, extraction and per-stage timing metrics in the Prometheus
+    text format.
+    """
+    return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def _extraction_filename(file):
+    """
+    Return the name that selects an upload's extractor.
+
+    Uploads without a supported extension fall back to their content type,
+    and then to the type told by their first bytes. Returns None for
+    unsupported files.
+    """
+    filename = resolve_filename(file.filename, file.content_type)
+    if get_extractor(filename) is None:
+        prefix = await file.read(SNIFF_BYTES)
+        await file.seek(0)
+        filename = resolve_filename(file.filename, sniff_prefix(prefix))
+    return filename if get_extractor(filename) is not None else None
+
+
+def _parse_limits(pages, max_chars, timeout):
+    """Parse the early-termination options of a request, or raise a 400."""
+    try:
+        return ExtractionLimits.parse(pages, max_chars, timeout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _upload_source(file, in_threads=True, max_bytes=IN_MEMORY_UPLOAD_BYTES):
+    """
+    Return what to extract an upload from, and a temporary file to remove.
+
+    Uploads up to ``max_bytes`` are extracted from memory. Larger ones were
+    already spooled to disk by the multipart parser and are read from there,
+    unless they go to a worker process, which needs a file path of its own.
+    """
+    content = await read_upload_file(file, max_bytes)
+    if content is not None:
+        return content, None
+    if in_threads:
+        await file.seek(0)
+        return file.file, None
+    temp_file_path = await save_upload_file(file)
+    return temp_file_path, temp_file_path
 
 
 # extract text from file
 @router.post("/extract")
-async def extract_text(file: UploadFile = File(...), enable_ocr: bool = Form(False)):
+async def extract_text(
+    request: Request,
+    file: UploadFile = File(...),
+    enable_ocr: bool = Form(False),
+    pages: str = Form(None),
+    max_chars: int = Form(None),
+    timeout: float = Form(None),
+    breakdown: bool = Form(False),
+):
     """
     Extract text from an uploaded file.
+
+    ``pages`` (e.g. ``1-3,7``) limits PDFs and PPTXs to some pages or
+    slides; ``max_chars`` and ``timeout`` stop extraction early. The
+    response's ``truncated`` field names the limit that cut it short.
+
+    Besides the text, the response lists the span of every page, slide,
+    paragraph and OCR'd image as character offsets, the OCR engine used and
+    per-stage timings. Send ``Accept: application/msgpack`` to get msgpack
+    instead of JSON. With ``breakdown`` the response also holds the seconds
+    spent opening, parsing, decoding images and running OCR.
     """
+    temp_file_path = None
     try:
-        # Validate file extension
-        file_extension = get_file_extension(file.filename)
-        if file_extension not in SUPPORTED_EXTENSIONS:
+        # Validate file type
+        filename = await _extraction_filename(file)
+        if filename is None:
             raise HTTPException(status_code=400, detail="Unsupported file type")
+        limits = _parse_limits(pages, max_chars, timeout)
 
-        # Save the uploaded file temporarily
-        temp_file_path = Path(f"temp/{file.filename}")
-        temp_file_path.parent.mkdir(exist_ok=True)
-        with open(temp_file_path, "wb") as temp_file:
-            temp_file.write(await file.read())
+        source, temp_file_path = await _upload_source(
+            file, isinstance(get_executor(), ThreadPoolExecutor)
+        )
 
-        # Extract text
-        result = extract_text_from_file(temp_file_path, enable_ocr)
+        # Extract text off the event loop, joining an identical upload's
+        # extraction when one is in flight
+        future, coalesced = await run_in_threadpool(
+            submit_extraction, get_executor(), source, enable_ocr, filename, limits
+        )
+        # Shielded so a client going away does not cancel a shared extraction
+        result, status_code = await asyncio.shield(asyncio.wrap_future(future))
+        record_extraction(source, filename, result, status_code, coalesced)
+        if status_code != 200:
+            raise HTTPException(status_code=status_code, detail=result)
+
+        fields = {"filename": file.filename}
+        if breakdown:
+            fields["breakdown"] = result.breakdown or {}
+
+        # Serialize once instead of having FastAPI walk a large nested dict
+        started = time.perf_counter()
+        response = None
+        if "application/msgpack" in request.headers.get("accept", ""):
+            try:
+                response = Response(
+                    result.to_msgpack(**fields), media_type="application/msgpack"
+                )
+            except ImportError:
+                # msgpack is optional; answer with JSON when it is missing
+                pass
+        if response is None:
+            response = Response(result.to_json(**fields), media_type="application/json")
+        STAGE_SECONDS.observe(
+            time.perf_counter() - started, get_extractor(filename).name, "serialize"
+        )
+        return response
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
         # Clean up temporary file
-        temp_file_path.unlink()
+        if temp_file_path:
+            remove_upload_file(temp_file_path)
 
-        if result[1] == 200:
-            extracted_text = result[0]
-            return {"filename": file.filename, "extracted_text": extracted_text}
-        else:
-            raise HTTPException(status_code=result[1], detail=result[0])
 
+# stream extracted text as it is produced
+@router.post("/extract/stream")
+async def extract_text_stream(
+    file: UploadFile = File(...), enable_ocr: bool = Form(False)
+):
+    """
+    Extract text from an uploaded file, streaming it as NDJSON.
+
+    Each line is a chunk ``{"kind", "number", "text"}`` for a page, slide,
+    paragraph or OCR'd image, sent as soon as it is extracted. An error
+    while extracting is reported as a final ``{"error"}`` line.
+    """
+    filename = await _extraction_filename(file)
+    if filename is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    # Chunks are produced on the thread pool, so the spooled upload is usable
+    source, _ = await _upload_source(file)
+    try:
+        chunks = await run_in_threadpool(
+            iter_extract_text_cached, source, enable_ocr, filename
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    def ndjson_lines():
+        try:
+            for chunk in chunks:
+                yield json.dumps(chunk._asdict()) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    # Starlette iterates the generator on its thread pool, chunk by chunk
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+# describe a file without extracting it
+@router.post("/inspect")
+async def inspect_file(file: UploadFile = File(...), enable_ocr: bool = Form(False)):
+    """
+    Describe an uploaded file from its content type and container alone.
+
+    Returns the type told by its first bytes, the extractor that would read
+    it, its page or slide count, image count, whether it has a text layer
+    and the memory extracting it is estimated to need, so clients can route
+    and price work before submitting it. Nothing is extracted.
+    """
+    # Inspected on the thread pool, so the spooled upload is usable
+    source, _ = await _upload_source(file)
+    try:
+        info = await run_in_threadpool(inspect_source, source, file.filename)
+        cost = await run_in_threadpool(
+            estimate_cost, source, file.filename, enable_ocr, info
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "filename": file.filename,
+        "mime_type": info.mime_type,
+        "extractor": info.extractor,
+        "matches_extension": info.matches_name,
+        "size": info.size,
+        "pages": info.pages,
+        "images": info.images,
+        "has_text_layer": info.has_text,
+        "estimated_memory_bytes": cost.memory_bytes,
+    }
+
 
 # extract text from multiple files
 @router.post("/extract-batch")
@@ -63,55 +281,225 @@ async def extract_text_batch(
     files: list[UploadFile] = File(...),
     enable_ocr: bool = Form(False),
     max_workers: int = Form(None),
+    backend: str = Form(None),
+    pages: str = Form(None),
+    max_chars: int = Form(None),
+    timeout: float = Form(None),
 ):
     """
     Extract text from multiple uploaded files concurrently.
+
+    Files run on the shared executor unless ``max_workers`` or ``backend``
+    asks for a dedicated one; ``max_workers`` is capped at
+    SCHEDULER_MAX_WORKERS. ``pages``, ``max_chars`` and ``timeout`` apply
+    to each file, as for ``/extract``. Uploads are held in memory up to
+    BATCH_IN_MEMORY_UPLOAD_BYTES in total.
     """
+    temp_files = []
     try:
-        # Save uploaded files temporarily
-        temp_files = []
+        if backend is not None and backend not in BACKENDS:
+            raise HTTPException(status_code=400, detail="Unsupported backend")
+        if max_workers is not None and max_workers < 1:
+            raise HTTPException(status_code=400, detail="max_workers must be positive")
+        limits = _parse_limits(pages, max_chars, timeout)
+
+        executor = None
+        if max_workers is None and backend is None:
+            executor = get_executor()
+            in_threads = isinstance(executor, ThreadPoolExecutor)
+        else:
+            in_threads = (backend or EXTRACTION_BACKEND) == "thread"
+
+        sources = []
+        memory_left = BATCH_IN_MEMORY_UPLOAD_BYTES
         for file in files:
-            temp_file_path = Path(f"temp/{file.filename}")
-            temp_file_path.parent.mkdir(exist_ok=True)
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(await file.read())
-            temp_files.append(temp_file_path)
-
-        # Process files
-        results, status_code = extract_text_from_files(
-            temp_files, enable_ocr, max_workers
+            # Resolved first, while the upload can still be sniffed
+            filename = await _extraction_filename(file) or file.filename
+            source, temp_file_path = await _upload_source(
+                file, in_threads, min(IN_MEMORY_UPLOAD_BYTES, memory_left)
+            )
+            if isinstance(source, bytes):
+                memory_left -= len(source)
+            sources.append((filename, source))
+            if temp_file_path:
+                temp_files.append(temp_file_path)
+
+        # Process files off the event loop; the batch itself only waits on
+        # its jobs, so it runs on the plain thread pool
+        results, status_code = await run_in_threadpool(
+            extract_text_from_files,
+            sources,
+            enable_ocr,
+            max_workers,
+            backend,
+            executor,
+            limits,
         )
 
+        return JSONResponse([{"results": results}, status_code])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
         # Clean up temporary files
         for temp_file in temp_files:
-            temp_file.unlink()
+            remove_upload_file(temp_file)
+
+
+def _client_id(request):
+    """Identify the client a job belongs to, for per-client limits."""
+    return request.headers.get("X-Client-ID") or (
+        request.client.host if request.client else "anonymous"
+    )
+
+
+# queue an extraction job
+@router.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    enable_ocr: bool = Form(False),
+):
+    """
+    Queue files for extraction and return a job id straight away.
+
+    Poll ``GET /jobs/{job_id}`` or stream ``GET /jobs/{job_id}/results`` for
+    the per-file results. Responds with 429 when the queue is full or the
+    client already has too many unfinished jobs.
+    """
+    client_id = _client_id(request)
+    filenames = [await _extraction_filename(file) for file in files]
+    for file, filename in zip(files, filenames):
+        if filename is None:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported file type: {file.filename}"
+            )
 
-        return {"results": results}, status_code
+    job_id = job_queue.new_job_id()
+    job_dir = job_queue.job_dir(job_id)
+    try:
+        # Reject before spooling anything when there is no room
+        await run_in_threadpool(job_queue.check_capacity, client_id, len(files))
+        saved_files = [
+            (file.filename, await save_upload_file(file, job_dir, filename=filename))
+            for file, filename in zip(files, filenames)
+        ]
+        await run_in_threadpool(
+            job_queue.submit, job_id, client_id, enable_ocr, saved_files
+        )
+    except (QueueFullError, ClientLimitError) as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "5"}
+        )
     except Exception as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {"job_id": job_id, "status": "queued"}
+
+
+# job status and results
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status of a job and the results of its finished files.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# stream job results as files finish
+@router.get("/jobs/{job_id}/results")
+async def stream_job_results(job_id: str):
+    """
+    Stream the result of each file of a job as NDJSON as soon as it finishes.
+    """
+    if await run_in_threadpool(job_queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def ndjson_lines():
+        sent = set()
+        while True:
+            job = await run_in_threadpool(job_queue.get, job_id)
+            finished = await run_in_threadpool(job_queue.finished_files, job_id, sent)
+            for result in finished:
+                sent.add(result.pop("id"))
+                yield json.dumps(result) + "\n"
+            # The job was read first, so once all its files had finished then
+            # every result has now been sent
+            if job is None or all(
+                file["status"] in FINISHED_FILE_STATUSES for file in job["files"]
+            ):
+                break
+            await asyncio.sleep(POLL_INTERVAL)
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+# cancel a job
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a job. Files already being extracted finish, the rest are dropped.
+    """
+    if await run_in_threadpool(job_queue.cancel, job_id):
+        return {"job_id": job_id, "status": "cancelled"}
+    if await run_in_threadpool(job_queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    raise HTTPException(status_code=409, detail="Job has already finished")
+
 
 @router.post("/generate-pptx/")
 async def generate_pptx(request: Request):
+    """
+    Generate a PPTX deck with a front and a back slide for every flashcard.
+
+    The deck is written in a worker thread to a spooled temporary file, kept
+    in memory up to PPTX_SPOOL_BYTES and on disk beyond, and streamed back in
+    chunks.
+    """
+    # Imported here so workers that never generate slides skip python-pptx
+    from utils.create_ppts import (
+        PPTX_MEDIA_TYPE,
+        PPTX_SPOOL_BYTES,
+        write_pptx_from_flashcards,
+    )
 
     # Parse the request body as JSON
     body = await request.json()
     flashcards = body.get("flashcards", [])
     style = body.get("style", "classic")
 
-    # # Create the PowerPoint presentation
-    presentation = create_pptx_from_flashcards(flashcards, style)
+    def write_deck():
+        deck = tempfile.SpooledTemporaryFile(max_size=PPTX_SPOOL_BYTES)
+        try:
+            write_pptx_from_flashcards(flashcards, deck, style)
+        except Exception:
+            deck.close()
+            raise
+        size = deck.tell()
+        deck.seek(0)
+        return deck, size
+
+    deck, size = await run_in_threadpool(write_deck)
 
-    # # Save the presentation to a BytesIO stream
-    pptx_stream = BytesIO()
-    presentation.save(pptx_stream)
-    pptx_stream.seek(0)
+    def deck_chunks():
+        with deck:
+            while chunk := deck.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
 
     # Return the PPTX file as a response
     return StreamingResponse(
-        pptx_stream,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        headers={"Content-Disposition": "attachment; filename=flashcards.pptx"},
+        deck_chunks(),
+        media_type=PPTX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": "attachment; filename=flashcards.pptx",
+            "Content-Length": str(size),
+        },
     )
 
 
@@ -120,4 +508,6 @@ async def get_styles():
     """
     Get a list of supported styles for creating flashcards.
     """
+    from utils.create_ppts import styles
+
     return {"styles": list(styles.keys())}
@@ -0,0 +1,234 @@
+"""
+Admission control for extraction jobs.
+
+Every extraction the API or the CLI runs is submitted through the
+scheduler, which holds it back until the memory it is estimated to need
+fits next to the jobs already running and a concurrency limit allows one
+more. The limit adapts to the machine: it is halved when free memory runs
+short and raised by one while jobs wait and the CPUs have headroom. A busy
+CPU only stops it growing, since OCR is meant to keep the CPUs saturated.
+
+Submitting never blocks: jobs wait in the scheduler's queue and one
+admission thread hands them to their executor, so requests waiting for
+room hold no thread of the web server's pool.
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from concurrent.futures.process import BrokenProcessPool
+from api.executor import MAX_WORKERS, JobLimitExceeded
+from utils.metrics import (
+    LIMIT_KILLS,
+    SCHEDULER_ADJUSTMENTS,
+    SCHEDULER_LIMIT,
+    SCHEDULER_RESERVED,
+    SCHEDULER_RUNNING,
+    SCHEDULER_WAIT_SECONDS,
+    SCHEDULER_WAITING,
+)
+from utils.resources import CpuSampler, memory_info
+
+logger = logging.getLogger("TextExtractor")
+
+# Upper bound of the concurrency limit, and of max_workers in batch requests
+SCHEDULER_MAX_WORKERS = int(os.environ.get("SCHEDULER_MAX_WORKERS", MAX_WORKERS))
+
+# Estimated memory the running jobs may reserve; default: half of the RAM
+SCHEDULER_MEMORY_BYTES = int(os.environ.get("SCHEDULER_MEMORY_BYTES", 0)) or int(
+    (memory_info()[0] or 0) * 0.5
+)
+
+# Free memory, as a fraction of the total, below which the limit is halved
+SCHEDULER_MIN_FREE_MEMORY = float(os.environ.get("SCHEDULER_MIN_FREE_MEMORY", 0.1))
+
+# CPU busy fraction below which the limit may grow
+SCHEDULER_TARGET_CPU = float(os.environ.get("SCHEDULER_TARGET_CPU", 0.8))
+
+# Seconds between two adjustments of the limit
+SCHEDULER_INTERVAL = float(os.environ.get("SCHEDULER_INTERVAL", 1.0))
+
+
+class _Job:
+    """A submitted job waiting to be admitted."""
+
+    __slots__ = ("future", "executor", "cost", "call", "submitted")
+
+    def __init__(self, future, executor, cost, call):
+        self.future = future
+        self.executor = executor
+        self.cost = cost
+        self.call = call
+        self.submitted = time.perf_counter()
+
+
+class AdmissionScheduler:
+    """
+    Admit jobs in arrival order by estimated memory and an adaptive limit.
+
+    A job is admitted when it is the oldest one waiting, fewer than
+    ``limit`` jobs run, and its estimated memory fits in ``memory_budget``
+    (0: no budget) next to theirs. A job is always admitted when nothing
+    runs, so one estimated above the budget still runs, alone.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=SCHEDULER_MAX_WORKERS,
+        memory_budget=SCHEDULER_MEMORY_BYTES,
+        interval=SCHEDULER_INTERVAL,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.memory_budget = memory_budget
+        self.interval = interval
+        self.limit = min(self.max_concurrency, os.cpu_count() or 1)
+        self.running = 0
+        self.reserved = 0
+        self._waiting = collections.deque()
+        self._condition = threading.Condition()
+        self._cpu = CpuSampler()
+        self._adjusted_at = 0.0
+        self._thread = None
+        self._publish()
+
+    def _publish(self):
+        SCHEDULER_LIMIT.set(self.limit)
+        SCHEDULER_RUNNING.set(self.running)
+        SCHEDULER_WAITING.set(len(self._waiting))
+        SCHEDULER_RESERVED.set(self.reserved)
+
+    def _fits(self, memory):
+        if not self.running:
+            return True
+        if self.running >= self.limit:
+            return False
+        return not self.memory_budget or self.reserved + memory <= self.memory_budget
+
+    def _adjust(self):
+        """Resize the limit from the current headroom, at most once an interval."""
+        now = time.monotonic()
+        if now - self._adjusted_at < self.interval:
+            return
+        self._adjusted_at = now
+
+        total, available = memory_info()
+        busy = self._cpu.busy()
+        if total and available < total * SCHEDULER_MIN_FREE_MEMORY:
+            direction, reason = "down", "memory"
+        elif (
+            self._waiting
+            and self.running >= self.limit
+            and (busy is None or busy < SCHEDULER_TARGET_CPU)
+        ):
+            direction, reason = "up", "headroom"
+        else:
+            return
+
+        if direction == "down":
+            limit = max(1, self.limit // 2)
+        else:
+            limit = min(self.max_concurrency, self.limit + 1)
+        if limit != self.limit:
+            logger.info(f"Extraction concurrency {self.limit} -> {limit} ({reason})")
+            SCHEDULER_ADJUSTMENTS.inc(1, direction, reason)
+            self.limit = limit
+
+    def _admit(self):
+        """Wait for the oldest job to fit, and return it once it is counted in."""
+        with self._condition:
+            while True:
+                self._adjust()
+                if self._waiting and self._fits(self._waiting[0].cost.memory_bytes):
+                    job = self._waiting.popleft()
+                    self.running += 1
+                    self.reserved += job.cost.memory_bytes
+                    self._publish()
+                    return job
+                self._publish()
+                # Wake up now and then to re-check the headroom
+                self._condition.wait(self.interval)
+
+    def _run(self):
+        """Hand admitted jobs to their executors, in arrival order."""
+        while True:
+            job = self._admit()
+            SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - job.submitted)
+            # Cancelled while it waited
+            if not job.future.set_running_or_notify_cancel():
+                self.release(job.cost)
+                continue
+            fn, args, kwargs = job.call
+            try:
+                inner = job.executor.submit(fn, *args, **kwargs)
+            except BaseException as e:
+                self.release(job.cost)
+                job.future.set_exception(e)
+                continue
+            inner.add_done_callback(
+                lambda done, job=job: self._finished(done, job.cost, job.future)
+            )
+
+    def release(self, cost):
+        """Return the slot and memory of a finished job."""
+        with self._condition:
+            self.running -= 1
+            self.reserved -= cost.memory_bytes
+            self._publish()
+            self._condition.notify_all()
+
+    def submit(self, executor, cost, fn, /, *args, **kwargs):
+        """
+        Queue ``fn(*args, **kwargs)`` to be submitted to executor once it is
+        admitted, and return a future of its result straight away.
+
+        The job's slot is released when it is done. Cancelling the future
+        before the job is admitted drops it from the queue.
+        """
+        future = Future()
+        job = _Job(future, executor, cost, (fn, args, kwargs))
+        future.add_done_callback(lambda done: self._drop(job))
+        with self._condition:
+            self._waiting.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="admission", daemon=True
+                )
+                self._thread.start()
+            self._publish()
+            self._condition.notify_all()
+        return future
+
+    def _drop(self, job):
+        """Remove a job from the queue if its future was cancelled while it waited."""
+        if not job.future.cancelled():
+            return
+        with self._condition:
+            try:
+                self._waiting.remove(job)
+            except ValueError:
+                # Already admitted; _run sees the cancellation
+                return
+            self._publish()
+            # The job after it may be the oldest one now
+            self._condition.notify_all()
+
+    def _finished(self, inner, cost, future):
+        self.release(cost)
+        if inner.cancelled():
+            future.set_exception(CancelledError())
+            return
+        error = inner.exception()
+        if error is None:
+            future.set_result(inner.result())
+            return
+        future.set_exception(error)
+        if isinstance(error, JobLimitExceeded):
+            LIMIT_KILLS.inc(1, error.reason)
+        elif isinstance(error, BrokenProcessPool):
+            LIMIT_KILLS.inc(1, "killed")
+
+
+scheduler = AdmissionScheduler()
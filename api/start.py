@@ -1,101 +1,315 @@
+import functools
 import os
+import sys
+import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from extractors.pdf_extractor import (
-    extract_text_from_pdf,
-    extract_text_and_images_from_pdf,
+from concurrent.futures import FIRST_COMPLETED, Future, as_completed, wait
+from api.executor import EXTRACTION_BACKEND, create_executor
+from api.scheduler import SCHEDULER_MAX_WORKERS, scheduler
+from extractors import EXTRACTOR_VERSION
+from extractors.cost import estimate_cost
+from extractors.ocr import init_backend, ocr_provenance, ocr_settings
+from extractors.ocr_plan import ocr_plan_settings
+from extractors.limits import ExtractionLimits, LimitedChunks
+from extractors.pdf_extractor import PDF_TEXT_ENGINE
+from extractors.registry import get_extractor, supported_extensions
+from extractors.result import RESULT_FORMAT, ExtractionResult
+from extractors.sniff import detect_extractor
+from extractors.source import hash_source, source_name, source_size
+from utils.file_utils import get_file_extension, iter_files, validate_file_exists
+from utils.cache import TieredCache, make_key
+from utils.logger import setup_logger
+from utils.manifest import MANIFEST_NAME, Manifest
+from utils.metrics import add_counts, collect, collect_counts, observe_extraction
+from utils.progress import ProgressReporter
+from utils.singleflight import SingleFlight
+
+logger = setup_logger()
+
+# Results are cached by content hash, so repeated uploads skip re-parsing
+EXTRACTION_CACHE_ENABLED = os.environ.get("EXTRACTION_CACHE", "1") == "1"
+EXTRACTION_CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR", "cache/extraction")
+EXTRACTION_CACHE_MEMORY_BYTES = int(
+    os.environ.get("EXTRACTION_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)
 )
-from extractors.pptx_extractor import (
-    extract_text_from_pptx,
-    extract_text_and_images_from_pptx,
+EXTRACTION_CACHE_DISK_BYTES = int(
+    os.environ.get("EXTRACTION_CACHE_DISK_BYTES", 1024 * 1024 * 1024)
 )
-from extractors.image_extractor import extract_text_from_image
-from extractors.docx_extractor import (
-    extract_text_from_docx,
-    extract_text_and_images_from_docx,
+
+# Files at least this large are written out chunk by chunk as they are
+# extracted instead of being held in memory, and skip the extraction cache
+STREAM_OUTPUT_BYTES = int(os.environ.get("STREAM_OUTPUT_BYTES", 64 * 1024 * 1024))
+
+# Concurrent requests for the same content and options share one extraction
+EXTRACTION_COALESCE_ENABLED = os.environ.get("EXTRACTION_COALESCE", "1") == "1"
+
+# Seconds between progress lines during directory runs
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", 10))
+
+extraction_cache = TieredCache(
+    EXTRACTION_CACHE_DIR if EXTRACTION_CACHE_ENABLED else None,
+    EXTRACTION_CACHE_MEMORY_BYTES if EXTRACTION_CACHE_ENABLED else 0,
+    EXTRACTION_CACHE_DISK_BYTES if EXTRACTION_CACHE_ENABLED else 0,
 )
-from extractors.txt_extractor import extract_text_from_txt
-from utils.file_utils import get_file_extension, validate_file_exists
-from utils.logger import setup_logger
 
-logger = setup_logger()
+extraction_flights = SingleFlight()
+
+
+def extraction_settings(enable_ocr):
+    """Return everything besides the file itself that affects extracted text."""
+    return (
+        enable_ocr,
+        ocr_settings(),
+        ocr_plan_settings() if enable_ocr else None,
+        PDF_TEXT_ENGINE,
+        EXTRACTOR_VERSION,
+    )
 
-SUPPORTED_EXTENSIONS = [
-    ".pdf",
-    ".pptx",
-    ".png",
-    ".jpg",
-    ".jpeg",
-    ".txt",
-    ".docx",
-    # '.doc', '.xls', '.xlsx', '.csv', '.json', '.xml', '.html', '.log'
-]
 
+def _cache_key(source, enable_ocr, filename=None, limits=None):
+    """Build the extraction cache key for a file and its options."""
+    return make_key(
+        hash_source(source),
+        get_file_extension(filename or source),
+        *extraction_settings(enable_ocr),
+        RESULT_FORMAT,
+        (limits.pages, limits.max_chars) if limits else None,
+    )
 
-def extract_text(file_path, enable_ocr=False) -> tuple[str, int]:
-    """Main function to extract text based on file type."""
-    file_extension = get_file_extension(file_path)
+
+def extract_result(
+    source, enable_ocr=False, filename=None, limits=None, cache_key=None, checked=False
+):
+    """
+    Extract a structured result, served from the cache when possible.
+
+    ``source`` is a file path, or the file's content as bytes or a binary
+    file object; ``filename`` then supplies the extension. ``limits`` is an
+    optional ExtractionLimits. ``cache_key`` saves hashing the content again
+    when the caller already built it, and ``checked`` says the caller also
+    looked it up and missed, so the result is only stored. Returns an
+    ExtractionResult and 200, or an error message and a status code.
+    """
+    name = filename or source_name(source)
+    if not EXTRACTION_CACHE_ENABLED or get_extractor(filename or source) is None:
+        return _extract_result(source, enable_ocr, filename, limits)
 
     try:
-        if file_extension == ".pdf":
-            return (
-                extract_text_and_images_from_pdf(file_path)
-                if enable_ocr
-                else extract_text_from_pdf(file_path)
-            ), 200
-        elif file_extension == ".pptx":
-            return (
-                extract_text_and_images_from_pptx(file_path)
-                if enable_ocr
-                else extract_text_from_pptx(file_path)
-            ), 200
-        elif file_extension in [".png", ".jpg", ".jpeg"]:
-            return extract_text_from_image(file_path), 200
-        elif file_extension == ".docx":
-            return (
-                extract_text_and_images_from_docx(file_path)
-                if enable_ocr
-                else extract_text_from_docx(file_path)
-            ), 200
-        elif file_extension == ".txt":
-            return extract_text_from_txt(file_path), 200
-        else:
-            return f"Unsupported file type: {file_extension}", 400
+        cache_key = cache_key or _cache_key(source, enable_ocr, filename, limits)
     except Exception as e:
-        logger.error(f"Error processing file {file_path}: {e}")
-        return f"Error processing file {file_path}: {e}", 500
-
+        logger.error(f"Error processing file {name}: {e}")
+        return f"Error processing file {name}: {e}", 500
+
+    cached = None if checked else extraction_cache.get(cache_key)
+    if cached is not None:
+        return ExtractionResult.from_json(cached), 200
+
+    result, status_code = _extract_result(source, enable_ocr, filename, limits)
+    # A result cut short by the timeout depends on the machine, not the file
+    if status_code == 200 and result.truncated != "timeout":
+        extraction_cache.set(cache_key, result.to_json())
+    return result, status_code
+
+
+def submit_extraction(executor, source, enable_ocr=False, filename=None, limits=None):
+    """
+    Submit extract_result to executor, joining an identical extraction in flight.
+
+    Requests for the same content with the same options share one future,
+    so a file uploaded by many clients at once is extracted a single time,
+    and cached results come back as a future that is already done.
+    Returns the future and whether it was shared with an earlier request.
+    The content is hashed here, so call this off the event loop; the job
+    then waits for the scheduler to admit it without holding the thread.
+    """
+
+    def submit(**kwargs):
+        # Held back by the scheduler until the machine has room for it
+        return scheduler.submit(
+            executor,
+            estimate_cost(source, filename, enable_ocr),
+            extract_result,
+            source,
+            enable_ocr=enable_ocr,
+            filename=filename,
+            limits=limits,
+            **kwargs,
+        )
+
+    if get_extractor(filename or source) is None:
+        return submit(), False
+
+    cache_key = None
+    if EXTRACTION_CACHE_ENABLED or EXTRACTION_COALESCE_ENABLED:
+        try:
+            cache_key = _cache_key(source, enable_ocr, filename, limits)
+        except Exception:
+            # extract_result reports the error
+            return submit(), False
+
+    if EXTRACTION_CACHE_ENABLED:
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            # Cached results skip the scheduler, so they never queue behind OCR
+            future = Future()
+            future.set_result((ExtractionResult.from_json(cached), 200))
+            return future, False
+    # Looked up above, so the job does not count a second miss
+    checked = EXTRACTION_CACHE_ENABLED
+    if not EXTRACTION_COALESCE_ENABLED:
+        return submit(cache_key=cache_key, checked=checked), False
+
+    # The timeout is not part of the cache key, but changes the result
+    flight_key = (cache_key, limits.timeout if limits else None)
+    return extraction_flights.submit(
+        flight_key, functools.partial(submit, cache_key=cache_key, checked=checked)
+    )
+
+
+def record_extraction(source, filename, result, status_code, coalesced=False):
+    """
+    Count an extraction in the metrics, and its OCR plan and cache counters
+    in ``/ocr/stats`` and ``/cache/stats``, in the process serving them.
+    """
+    extractor = get_extractor(filename or source)
+    observe_extraction(
+        extractor.name if extractor else "unsupported",
+        result,
+        status_code,
+        source_size(source),
+        coalesced,
+    )
+    if status_code == 200 and not coalesced and result.counts:
+        add_counts(result.counts)
+
+
+def extract_text(
+    source, enable_ocr=False, filename=None, limits=None
+) -> tuple[str, int]:
+    """Main function to extract text, served from the cache when possible."""
+    result, status_code = extract_result(source, enable_ocr, filename, limits)
+    return (result.text if status_code == 200 else result), status_code
+
+
+def iter_extract_text(source, enable_ocr=False, filename=None, pages=None):
+    """
+    Return an iterator of text chunks from the extractor registered for a file.
+
+    The extractor is chosen by the file's content where it tells the type,
+    and by its extension otherwise. Raises ValueError straight away for
+    unsupported file types and files whose content contradicts their
+    extension; extraction errors surface while iterating. ``pages`` selects
+    page ranges of paged formats.
+    """
+    extractor = detect_extractor(source, filename)
+    if extractor is None:
+        file_extension = get_file_extension(filename or source)
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    return extractor.iter_chunks(source, enable_ocr, pages)
+
+
+def iter_extract_text_cached(source, enable_ocr=False, filename=None):
+    """Like iter_extract_text, but replay the chunks of a cached result."""
+    if EXTRACTION_CACHE_ENABLED:
+        cached = extraction_cache.get(_cache_key(source, enable_ocr, filename))
+        if cached is not None:
+            return ExtractionResult.from_json(cached).chunks()
+    return iter_extract_text(source, enable_ocr, filename)
+
+
+def _extract_result(source, enable_ocr=False, filename=None, limits=None):
+    """Extract a structured result based on file type."""
+    limits = limits or ExtractionLimits()
+    try:
+        chunks = iter_extract_text(source, enable_ocr, filename, limits.pages)
+    except ValueError as e:
+        return str(e), 400
 
-def extract_text_from_files(files, enable_ocr=False, max_workers=None):
-    """Extract text from multiple uploaded files concurrently."""
     try:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(extract_text, file_path, enable_ocr): file_path
-                for file_path in files
-            }
+        with collect() as breakdown, collect_counts() as counts:
+            if limits.max_chars is not None or limits.timeout is not None:
+                chunks = LimitedChunks(chunks, limits.max_chars, limits.timeout)
+            result = ExtractionResult.from_chunks(chunks)
+        result.truncated = getattr(chunks, "truncated", None)
+        result.breakdown = breakdown
+        result.counts = counts
+    except Exception as e:
+        name = filename or source_name(source)
+        logger.error(f"Error processing file {name}: {e}")
+        return f"Error processing file {name}: {e}", 500
+
+    if result.has_kind("ocr"):
+        result.ocr = ocr_provenance()
+    return result, 200
+
+
+def extract_text_from_files(
+    files,
+    enable_ocr=False,
+    max_workers=None,
+    backend=None,
+    executor=None,
+    limits=None,
+):
+    """
+    Extract text from multiple uploaded files concurrently.
+
+    ``files`` holds file paths or ``(filename, source)`` pairs for content
+    held in memory. Files are processed on ``executor`` when given,
+    otherwise on a new executor for ``backend`` that is shut down once the
+    batch is done.
+    """
+    try:
+        owns_executor = executor is None
+        if owns_executor:
+            # Clients cannot ask for more workers than the scheduler runs
+            max_workers = min(
+                max_workers or SCHEDULER_MAX_WORKERS, SCHEDULER_MAX_WORKERS
+            )
+            executor = create_executor(backend or EXTRACTION_BACKEND, max_workers)
+        try:
+            # Duplicate files share a future, so a future maps to all of them
+            future_to_files = {}
+            for file in files:
+                filename, source = (
+                    file if isinstance(file, tuple) else (Path(file).name, file)
+                )
+                future, coalesced = submit_extraction(
+                    executor, source, enable_ocr, filename, limits
+                )
+                future_to_files.setdefault(future, []).append(
+                    (filename, source, coalesced)
+                )
 
             results = []
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
-                try:
-                    extracted_text, status_code = future.result()
-                    results.append(
-                        {
-                            "filename": Path(file_path).name,
-                            "extracted_text": extracted_text,
-                            "status_code": status_code,
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
-                    results.append(
-                        {
-                            "filename": Path(file_path).name,
-                            "extracted_text": f"Error processing {file_path}: {e}",
-                            "status_code": 500,
-                        }
-                    )
+            for future in as_completed(future_to_files):
+                for filename, source, coalesced in future_to_files[future]:
+                    try:
+                        result, status_code = future.result()
+                        record_extraction(
+                            source, filename, result, status_code, coalesced
+                        )
+                        ok = status_code == 200
+                        results.append(
+                            {
+                                "filename": filename,
+                                "extracted_text": result.text if ok else result,
+                                "status_code": status_code,
+                                "truncated": result.truncated if ok else None,
+                            }
+                        )
+                    except Exception as e:
+                        logger.error(f"Error processing {filename}: {e}")
+                        results.append(
+                            {
+                                "filename": filename,
+                                "extracted_text": f"Error processing {filename}: {e}",
+                                "status_code": 500,
+                            }
+                        )
+        finally:
+            if owns_executor:
+                executor.shutdown()
 
         return results, 200
     except Exception as e:
@@ -116,75 +330,254 @@ def save_text_to_file(text, output_path):
         raise
 
 
-def process_file(file_path, output_dir, enable_ocr=False):
-    """Process a single file."""
+def stream_text_to_file(file_path, enable_ocr=False, output_path=None, limits=None):
+    """
+    Write the text of a file to output_path, or stdout, as it is extracted.
+
+    Only one chunk is held in memory at a time. Returns which limit, if
+    any, cut the text short, like ``ExtractionResult.truncated``. A partly
+    written output file is removed when extraction fails.
+    """
+    limits = limits or ExtractionLimits()
+    chunks = iter_extract_text(file_path, enable_ocr, pages=limits.pages)
+    if limits.max_chars is not None or limits.timeout is not None:
+        chunks = LimitedChunks(chunks, limits.max_chars, limits.timeout)
+
+    if output_path is None:
+        for chunk in chunks:
+            sys.stdout.write(chunk.text)
+        return getattr(chunks, "truncated", None)
+
+    try:
+        with open(output_path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk.text)
+    except Exception:
+        Path(output_path).unlink(missing_ok=True)
+        raise
+    logger.info(f"Extracted text saved to {output_path}")
+    return getattr(chunks, "truncated", None)
+
+
+def output_file_for(file_path, output_dir, root=None):
+    """
+    Return where the text extracted from file_path is saved.
+
+    Files found under ``root`` keep their relative directory inside
+    ``output_dir``, so equal names in different folders do not collide.
+    """
+    output_dir = Path(output_dir)
+    if root is not None:
+        output_dir = output_dir / Path(file_path).parent.relative_to(root)
+    return output_dir / (Path(file_path).stem + "_extracted.txt")
+
+
+def process_file(file_path, output_dir, enable_ocr=False, root=None, limits=None):
+    """
+    Process a single file.
+
+    Returns the output path (None when printing), the status code and the
+    time spent extracting. The status is 206 when the output was cut short
+    by the timeout. Files of STREAM_OUTPUT_BYTES or more are streamed to
+    their output.
+    """
+    output_file = None
+    started = time.perf_counter()
     try:
         logger.info(f"Processing file: {file_path}")
-        text = extract_text(file_path, enable_ocr)
+        if os.path.getsize(file_path) >= STREAM_OUTPUT_BYTES:
+            if output_dir:
+                output_file = output_file_for(file_path, output_dir, root)
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+            else:
+                print(f"\nExtracted Text from {file_path}:")
+            truncated = stream_text_to_file(file_path, enable_ocr, output_file, limits)
+            status_code = 206 if truncated == "timeout" else 200
+            return output_file, status_code, time.perf_counter() - started
+
+        result, status_code = extract_result(file_path, enable_ocr, limits=limits)
+        if status_code != 200:
+            logger.error(f"Error processing {file_path}: {result}")
+            return output_file, status_code, time.perf_counter() - started
+
+        text = result.text
+        if result.truncated == "timeout":
+            status_code = 206
         if output_dir:
-            output_file = Path(output_dir) / (Path(file_path).stem + "_extracted.txt")
+            output_file = output_file_for(file_path, output_dir, root)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
             save_text_to_file(text, output_file)
         else:
             print(f"\nExtracted Text from {file_path}:\n{text}\n")
     except Exception as e:
         logger.error(f"Error processing {file_path}: {e}")
+        status_code = 500
+    return output_file, status_code, time.perf_counter() - started
 
 
 def process_directory_concurrently(
-    directory_path, output_dir, enable_ocr=False, max_workers=4
+    directory_path,
+    output_dir,
+    enable_ocr=False,
+    max_workers=None,
+    backend="thread",
+    incremental=True,
+    include=None,
+    exclude=None,
+    max_in_flight=None,
+    progress_interval=PROGRESS_INTERVAL,
+    limits=None,
 ):
-    """Process all supported files in a directory concurrently."""
+    """
+    Process all supported files under a directory tree concurrently.
+
+    Files are fed to the executor as the tree is walked, with at most
+    ``max_in_flight`` of them (default: four per worker) submitted at once,
+    so memory does not grow with the size of the tree. The scheduler admits
+    each file by its estimated cost, so ``max_workers`` (default:
+    SCHEDULER_MAX_WORKERS) only bounds how many run at once. ``include``
+    and ``exclude`` are glob patterns matched against paths relative to
+    the directory. ``limits`` is an optional ExtractionLimits applied per
+    file.
+
+    When ``incremental`` is set and there is an ``output_dir``, a manifest
+    kept there records what was already extracted: unchanged files are
+    skipped and the output of files deleted since the last run is removed.
+    """
     try:
         directory = Path(directory_path)
         if not directory.is_dir():
             raise NotADirectoryError(f"{directory_path} is not a valid directory.")
 
-        files_to_process = [
-            file_path
-            for file_path in directory.iterdir()
-            if file_path.suffix.lower() in SUPPORTED_EXTENSIONS
-        ]
+        exclude = list(exclude or [])
+        if output_dir:
+            # Never pick up our own output when it lives inside the tree
+            output_root = Path(output_dir).resolve()
+            if output_root.is_relative_to(directory.resolve()):
+                relative_output = output_root.relative_to(directory.resolve())
+                if relative_output.parts:
+                    exclude.append(relative_output.as_posix())
+
+        files = iter_files(directory, supported_extensions(), include, exclude)
+        max_workers = max_workers or SCHEDULER_MAX_WORKERS
+        max_in_flight = max_in_flight or 4 * max_workers
+        progress = ProgressReporter(progress_interval)
+
+        manifest = None
+        if incremental and output_dir:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            manifest = Manifest(Path(output_dir) / MANIFEST_NAME, directory)
+            options = make_key(*extraction_settings(enable_ocr), limits)
+
+        def finish(future, file_path):
+            try:
+                output_file, status_code, duration = future.result()
+            except Exception as e:
+                logger.error(f"Error processing {file_path}: {e}")
+                status_code = 500
+            if status_code not in (200, 206):
+                progress.update("failed")
+                if manifest:
+                    manifest.mark_seen(file_path)
+            else:
+                progress.update("processed")
+                # Timed-out output is kept but retried on the next run
+                if manifest and status_code == 206:
+                    manifest.mark_seen(file_path)
+                elif manifest:
+                    manifest.record(file_path, options, output_file, duration)
+
+        try:
+            with create_executor(backend, max_workers) as executor:
+                in_flight = {}
+                for file_path in files:
+                    if manifest and manifest.is_current(file_path, options):
+                        progress.update("skipped")
+                        continue
+
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            finish(future, in_flight.pop(future))
+
+                    future = scheduler.submit(
+                        executor,
+                        # Inspecting every file here would hold up the walk
+                        estimate_cost(file_path, enable_ocr=enable_ocr, inspect=False),
+                        process_file,
+                        file_path,
+                        output_dir,
+                        enable_ocr=enable_ocr,
+                        root=directory,
+                        limits=limits,
+                    )
+                    in_flight[future] = file_path
+
+                for future in as_completed(in_flight):
+                    finish(future, in_flight[future])
+
+            pruned = manifest.prune() if manifest else 0
+        finally:
+            if manifest:
+                manifest.close()
 
-        if not files_to_process:
+        if not progress.total:
             print("No supported files found in the directory.")
             return
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(
-                    process_file, file_path, output_dir, enable_ocr
-                ): file_path
-                for file_path in files_to_process
-            }
-
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
-
-        print(f"Processed {len(files_to_process)} files.")
+        print(f"Processed {progress.counts['processed']} files.")
+        if progress.counts["failed"]:
+            print(f"Failed: {progress.counts['failed']} files.")
+        if manifest:
+            print(
+                f"Skipped {manifest.skipped} unchanged files "
+                f"(about {manifest.saved_seconds:.1f}s of extraction saved)."
+            )
+            print(f"Pruned {pruned} deleted files.")
+        progress.report()
     except Exception as e:
         logger.error(f"Error processing directory {directory_path}: {e}")
         raise
 
 
-def start(input_path, output_path, enable_ocr, max_workers):
+def start(
+    input_path,
+    output_path,
+    enable_ocr,
+    max_workers,
+    backend="thread",
+    incremental=True,
+    include=None,
+    exclude=None,
+    limits=None,
+):
     if not os.path.exists(output_path):
         os.makedirs(output_path)
+    # tesserocr must be imported here, before any worker thread OCRs; images
+    # are OCR'd even without enable_ocr
+    init_backend()
 
     try:
         if Path(input_path).is_file():
             # Single file processing
             validate_file_exists(input_path)
-            text = extract_text(input_path, enable_ocr)
-            print(f"\nExtracted Text from {input_path}:\n{text}\n")
-
+            output_file = None
             if output_path:
                 output_file = Path(output_path) / (
                     Path(input_path).stem + "_extracted.txt"
                 )
+
+            # Large files go straight to their output instead of the console
+            if os.path.getsize(input_path) >= STREAM_OUTPUT_BYTES:
+                if output_file is None:
+                    print(f"\nExtracted Text from {input_path}:")
+                stream_text_to_file(input_path, enable_ocr, output_file, limits)
+                return
+
+            text, status_code = extract_text(input_path, enable_ocr, limits=limits)
+            print(f"\nExtracted Text from {input_path}:\n{text}\n")
+
+            if output_file and status_code == 200:
                 save_text_to_file(text, output_file)
 
         elif Path(input_path).is_dir():
@@ -192,7 +585,15 @@ def start(input_path, output_path, enable_ocr, max_workers):
             if output_path:
                 Path(output_path).mkdir(parents=True, exist_ok=True)
             process_directory_concurrently(
-                input_path, output_path, enable_ocr, max_workers
+                input_path,
+                output_path,
+                enable_ocr,
+                max_workers,
+                backend,
+                incremental,
+                include,
+                exclude,
+                limits=limits,
             )
         else:
             raise ValueError(f"Invalid input path: {input_path}")
@@ -221,6 +622,36 @@ def start(input_path, output_path, enable_ocr, max_workers):
 #         default=4,
 #         help="Number of workers for parallel processing (default: 4)",
 #     )
+#     parser.add_argument(
+#         "--include",
+#         nargs="+",
+#         help="Only process files matching these globs, e.g. 'reports/*.pdf'",
+#     )
+#     parser.add_argument(
+#         "--exclude",
+#         nargs="+",
+#         help="Skip files and directories matching these globs",
+#     )
+#     parser.add_argument(
+#         "--pages", help="Only extract these pages or slides, e.g. '1-3,7'"
+#     )
+#     parser.add_argument(
+#         "--max-chars", type=int, help="Stop after this many characters per file"
+#     )
+#     parser.add_argument(
+#         "--timeout", type=float, help="Stop extracting a file after this many seconds"
+#     )
+#     parser.add_argument(
+#         "--full",
+#         action="store_true",
+#         help="Re-extract every file instead of only new or changed ones",
+#     )
+#     parser.add_argument(
+#         "--backend",
+#         choices=["thread", "process", "hybrid"],
+#         default="thread",
+#         help="Execution backend for parallel processing (default: thread)",
+#     )
 
 #     args = parser.parse_args()
 
@@ -228,8 +659,19 @@ def start(input_path, output_path, enable_ocr, max_workers):
 #     output_path = args.output if args.output else "./test_data/extracted_text"
 #     enable_ocr = args.enable_ocr
 #     max_workers = args.workers
-
-#     start(input_path, output_path, enable_ocr, max_workers)
+#     backend = args.backend
+
+#     start(
+#         input_path,
+#         output_path,
+#         enable_ocr,
+#         max_workers,
+#         backend,
+#         not args.full,
+#         args.include,
+#         args.exclude,
+#         ExtractionLimits.parse(args.pages, args.max_chars, args.timeout),
+#     )
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,125 @@
+"""
+Latency of small /extract requests while large OCR jobs run concurrently.
+
+Starts the API in-process with uvicorn (or targets --url), keeps a number of
+large OCR extractions in flight and measures p50/p99 latency of small TXT
+extractions, with and without the background load. The same files are
+posted again and again, so the in-process API runs with the extraction and
+OCR caches and request coalescing turned off; start a --url server with
+EXTRACTION_CACHE=0 OCR_CACHE=0 EXTRACTION_COALESCE=0 to measure it the same
+way.
+
+Usage:
+    python -m benchmarks.api_load --requests 200 --large-jobs 4
+
+Requires httpx in addition to the API dependencies.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.corpus import generate_pdf
+from benchmarks.stats import summarize
+
+
+def start_server(port):
+    """Run the API with uvicorn on a background thread."""
+    import uvicorn
+    from api.app import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def post_file(client, path, enable_ocr):
+    """Upload one file to /extract and return the request latency."""
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        response = await client.post(
+            "/extract",
+            files={"file": (Path(path).name, f)},
+            data={"enable_ocr": str(enable_ocr).lower()},
+        )
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def background_load(client, path, stop):
+    """Keep one large OCR extraction in flight until stopped."""
+    while not stop.is_set():
+        await post_file(client, path, enable_ocr=True)
+
+
+async def measure(url, small_file, large_file, requests, large_jobs):
+    """Measure small-request latency before and during large OCR jobs."""
+    timeout = httpx.Timeout(None)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        baseline = [await post_file(client, small_file, False) for _ in range(requests)]
+
+        stop = asyncio.Event()
+        load = [
+            asyncio.create_task(background_load(client, large_file, stop))
+            for _ in range(large_jobs)
+        ]
+        # Give the large jobs time to reach the OCR stage
+        await asyncio.sleep(1)
+        loaded = [await post_file(client, small_file, False) for _ in range(requests)]
+        stop.set()
+        await asyncio.gather(*load)
+
+    return {"baseline": summarize(baseline), "under_load": summarize(loaded)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--large-jobs", type=int, default=4)
+    parser.add_argument("--large-file", help="Large document to OCR")
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        small_file = Path(work_dir) / "small.txt"
+        small_file.write_text("hello world\n" * 100, encoding="utf-8")
+        large_file = args.large_file
+        if not large_file:
+            large_file = Path(work_dir) / "large.pdf"
+            generate_pdf(large_file, args.pages)
+
+        url = args.url
+        if not url:
+            # Read when the API modules are imported by start_server
+            os.environ["EXTRACTION_CACHE"] = "0"
+            os.environ["OCR_CACHE"] = "0"
+            os.environ["EXTRACTION_COALESCE"] = "0"
+            start_server(args.port)
+            url = f"http://127.0.0.1:{args.port}"
+
+        report = asyncio.run(
+            measure(url, small_file, large_file, args.requests, args.large_jobs)
+        )
+
+    for name, stats in report.items():
+        print(
+            f"{name:>10}: n={stats['count']} p50={stats['p50_ms']:.1f}ms "
+            f"p99={stats['p99_ms']:.1f}ms max={stats['max_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Files per second for each execution backend at increasing worker counts.
+
+Generates a corpus of PDFs and runs ``extract_text_from_files`` over it with
+the thread, process and hybrid backends at 1/2/4/8/16 workers. The files
+are copies of one document, so the extraction and OCR caches and request
+coalescing are turned off.
+
+Usage:
+    python -m benchmarks.backend_scaling --files 64 --pages 20 --enable-ocr
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from api.executor import BACKENDS, create_executor
+from benchmarks.corpus import generate_pdf
+
+
+def run(files, backend, workers, enable_ocr):
+    """Return files per second for one backend and worker count."""
+    # Imported here, after main() turned the caches off
+    from api.start import extract_text_from_files
+
+    executor = create_executor(backend, workers)
+    try:
+        # Warm the pool so process start-up is not part of the measurement
+        extract_text_from_files(files[:workers], enable_ocr, executor=executor)
+        started = time.perf_counter()
+        results, _ = extract_text_from_files(files, enable_ocr, executor=executor)
+        elapsed = time.perf_counter() - started
+    finally:
+        executor.shutdown()
+
+    failed = sum(1 for result in results if result["status_code"] != 200)
+    if failed:
+        print(f"warning: {failed} files failed with {backend}/{workers}")
+    return len(files) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--enable-ocr", action="store_true")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    # Inherited by the worker processes
+    os.environ["EXTRACTION_CACHE"] = "0"
+    os.environ["OCR_CACHE"] = "0"
+    os.environ["EXTRACTION_COALESCE"] = "0"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        template = Path(work_dir) / "template.pdf"
+        generate_pdf(template, args.pages, with_images=args.enable_ocr)
+        files = []
+        for index in range(args.files):
+            file_path = Path(work_dir) / f"doc_{index}.pdf"
+            file_path.write_bytes(template.read_bytes())
+            files.append(file_path)
+
+        print(f"{'backend':>8} " + " ".join(f"{w:>8}" for w in args.workers))
+        for backend in args.backends:
+            rates = [run(files, backend, w, args.enable_ocr) for w in args.workers]
+            print(f"{backend:>8} " + " ".join(f"{rate:8.2f}" for rate in rates))
+        print("(files per second)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare two benchmark suite results and flag regressions.
+
+Prints the relative change of every target's throughput, latency and peak
+RSS between a baseline and a candidate JSON file written by
+``benchmarks.suite``. Exits with status 1 when any metric got worse by more
+than the threshold, so it can gate a CI job.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Metric: True when higher is better
+METRICS = {
+    "files_per_second": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def load(path):
+    report = json.loads(Path(path).read_text(encoding="utf-8"))
+    results = {
+        result["target"]: result
+        for result in report["results"]
+        if "error" not in result
+    }
+    return report, results
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Return rows of ``(target, metric, before, after, change %, regressed)``.
+
+    ``change`` is positive when the candidate is better.
+    """
+    rows = []
+    for target, before in baseline.items():
+        after = candidate.get(target)
+        if after is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if not before.get(metric) or metric not in after:
+                continue
+            change = (after[metric] - before[metric]) / before[metric] * 100
+            if not higher_is_better:
+                change = -change
+            rows.append(
+                (
+                    target,
+                    metric,
+                    before[metric],
+                    after[metric],
+                    change,
+                    change < -threshold,
+                )
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Allowed change in percent"
+    )
+    args = parser.parse_args()
+
+    baseline_report, baseline = load(args.baseline)
+    candidate_report, candidate = load(args.candidate)
+
+    for key in ["suite_version", "corpus", "settings", "cpu_count"]:
+        if baseline_report.get(key) != candidate_report.get(key):
+            print(f"warning: {key} differs, results may not be comparable")
+    for target in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"warning: {target} only ran in one of the files")
+
+    print(
+        f"{baseline_report.get('commit') or args.baseline} -> "
+        f"{candidate_report.get('commit') or args.candidate}"
+    )
+    print(f"{'target':>28} {'metric':>16} {'before':>10} {'after':>10} {'change':>8}")
+    rows = compare(baseline, candidate, args.threshold)
+    for target, metric, before, after, change, regressed in rows:
+        print(
+            f"{target:>28} {metric:>16} {before:10.2f} {after:10.2f} "
+            f"{change:+7.1f}%" + ("  REGRESSION" if regressed else "")
+        )
+
+    regressions = sum(1 for row in rows if row[-1])
+    if regressions:
+        print(f"{regressions} metrics regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import hashlib
+import io
+import random
+import zipfile
+from pathlib import Path
+
+# Seeds the generated text, so a corpus is the same on every machine
+CORPUS_SEED = 1234
+
+WORDS = (
+    "extraction document page slide table image text benchmark corpus "
+    "throughput latency memory report quarterly revenue figure summary "
+    "analysis result section paragraph appendix overview customer region"
+).split()
+
+
+def random_sentences(rng, count, words_per_sentence=12):
+    """Return count sentences of pseudo-random words."""
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(words_per_sentence)).capitalize()
+        + "."
+        for _ in range(count)
+    ]
+
+
+def render_text_image(lines=40, size=(1600, 1200)):
+    """Return PNG bytes of an image filled with lines of text."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        draw.text((40, 20 + line * 28), f"Benchmark line {line} " * 6, fill="black")
+    image_buffer = io.BytesIO()
+    image.save(image_buffer, format="PNG")
+    return image_buffer.getvalue()
+
+
+def generate_pdf(path, pages=50, with_images=True):
+    """Write a PDF with a text layer and, optionally, one image on every page."""
+    import fitz
+
+    image_bytes = render_text_image() if with_images else None
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Benchmark page {page_number + 1}")
+        for line in range(30):
+            page.insert_text(
+                (72, 480 + line * 10), f"Line {line} of page {page_number + 1}"
+            )
+        if image_bytes:
+            page.insert_image(fitz.Rect(72, 100, 540, 450), stream=image_bytes)
+    document.save(path, no_new_id=True)
+    document.close()
+
+
+def generate_scanned_pdf(path, pages=10):
+    """Write a PDF of image-only pages, as produced by a scanner."""
+    import fitz
+
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        image_bytes = render_text_image(lines=30 + page_number % 10)
+        page.insert_image(page.rect, stream=image_bytes)
+    document.save(path, no_new_id=True)
+    document.close()
+
+
+def _normalize_zip(path):
+    """Rewrite a zip-based document with fixed timestamps, so it hashes the same."""
+    with zipfile.ZipFile(path) as archive:
+        entries = [(info, archive.read(info)) for info in archive.infolist()]
+    with zipfile.ZipFile(path, "w") as archive:
+        for info, data in entries:
+            fixed = zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0))
+            fixed.compress_type = info.compress_type
+            archive.writestr(fixed, data)
+
+
+def generate_pptx(path, slides=20, seed=CORPUS_SEED):
+    """Write a PPTX with a title, bullet text and an image on every slide."""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    rng = random.Random(seed)
+    image_bytes = render_text_image(lines=12, size=(800, 400))
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for slide_number in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Benchmark slide {slide_number + 1}"
+        slide.placeholders[1].text = "\n".join(random_sentences(rng, 4))
+        slide.shapes.add_picture(
+            io.BytesIO(image_bytes), Inches(1), Inches(5), width=Inches(4)
+        )
+    presentation.core_properties.modified = presentation.core_properties.created
+    presentation.save(path)
+    _normalize_zip(path)
+
+
+def generate_docx(path, paragraphs=200, tables=10, images=5, seed=CORPUS_SEED):
+    """Write a DOCX with paragraphs, tables and embedded images."""
+    from docx import Document
+    from docx.shared import Inches
+
+    rng = random.Random(seed)
+    image_bytes = render_text_image(lines=12, size=(800, 400))
+    document = Document()
+    for paragraph_number in range(paragraphs):
+        document.add_paragraph(" ".join(random_sentences(rng, 3)))
+        if tables and paragraph_number % (paragraphs // tables or 1) == 0:
+            table = document.add_table(rows=5, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = rng.choice(WORDS)
+        if images and paragraph_number % (paragraphs // images or 1) == 0:
+            document.add_picture(io.BytesIO(image_bytes), width=Inches(4))
+    document.core_properties.modified = document.core_properties.created
+    document.save(path)
+    _normalize_zip(path)
+
+
+def generate_txt(path, megabytes=10, seed=CORPUS_SEED):
+    """Write a UTF-8 text file of roughly the given size."""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as file:
+        written = 0
+        while written < target:
+            line = " ".join(random_sentences(rng, 4)) + "\n"
+            file.write(line)
+            written += len(line)
+
+
+# name: (file name, generator, keyword arguments at scale 1)
+CORPUS = {
+    "pdf_text": ("text.pdf", generate_pdf, {"pages": 50, "with_images": False}),
+    "pdf_images": ("images.pdf", generate_pdf, {"pages": 10, "with_images": True}),
+    "pdf_scanned": ("scanned.pdf", generate_scanned_pdf, {"pages": 10}),
+    "pptx": ("slides.pptx", generate_pptx, {"slides": 20}),
+    "docx": ("document.docx", generate_docx, {"paragraphs": 200}),
+    "txt": ("large.txt", generate_txt, {"megabytes": 10}),
+}
+
+# Arguments multiplied by the corpus scale
+SCALED_ARGUMENTS = ["pages", "slides", "paragraphs", "megabytes"]
+
+
+def generate_corpus(directory, scale=1, names=None):
+    """
+    Write one document of every corpus kind into directory.
+
+    ``scale`` multiplies page, slide, paragraph and size counts. Returns a
+    dict of kind to ``{"path", "bytes", "sha256"}``; the hashes tell whether
+    two benchmark runs measured the same corpus.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    documents = {}
+    for name in names or CORPUS:
+        file_name, generate, arguments = CORPUS[name]
+        arguments = {
+            key: max(1, round(value * scale)) if key in SCALED_ARGUMENTS else value
+            for key, value in arguments.items()
+        }
+        path = directory / file_name
+        generate(path, **arguments)
+        content = path.read_bytes()
+        documents[name] = {
+            "path": str(path),
+            "bytes": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+    return documents
@@ -0,0 +1,76 @@
+"""
+Cold-start import time of the CLI and API entry points.
+
+Each measurement runs in a fresh interpreter, so nothing is cached in
+sys.modules. The "eager" variants also import every registered extractor
+and its parsing libraries, as a warm worker process does. That is what
+start-up cost before extractors were loaded lazily.
+
+Usage:
+    python -m benchmarks.import_time --repeat 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks.stats import summarize
+
+HEAVY_MODULES = ["fitz", "PyPDF2", "pptx", "docx", "PIL", "pytesseract"]
+
+TARGETS = {
+    "cli": "import api.start",
+    "cli (eager)": "import api.start; from api.executor import _warm_worker; _warm_worker()",
+    "cli, one .txt": (
+        "import api.start, tempfile; f = tempfile.NamedTemporaryFile(suffix='.txt');"
+        " f.write(b'text'); f.flush(); api.start._extract_result(f.name)"
+    ),
+    "api worker": "import api.app",
+    "api worker (eager)": (
+        "import api.app; from api.executor import _warm_worker; _warm_worker()"
+    ),
+}
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(statement, repeat):
+    """Return the import times of statement and the heavy modules it loaded."""
+    script = SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+    return summarize(timings), result["heavy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'target':>20} {'p50 ms':>8} {'p99 ms':>8}  heavy modules loaded")
+    for name, statement in TARGETS.items():
+        stats, heavy = measure(statement, args.repeat)
+        print(
+            f"{name:>20} {stats['p50_ms']:8.1f} {stats['p99_ms']:8.1f}  "
+            f"{', '.join(heavy) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Per-image OCR latency of the tesserocr and pytesseract backends.
+
+Renders text images of a few sizes and OCRs each one with every available
+backend, first one at a time (latency) and then from a thread pool
+(throughput). The OCR cache is bypassed so every call reaches tesseract.
+
+Usage:
+    python -m benchmarks.ocr_backends --images 50 --threads 4
+"""
+
+import argparse
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from benchmarks.corpus import render_text_image
+from benchmarks.stats import summarize
+from extractors.ocr import create_backend
+
+BACKENDS = ["tesserocr", "pytesseract"]
+SIZES = [(400, 200), (1600, 1200)]
+
+
+def measure(backend, images, threads):
+    """Return latency stats and images per second for one backend."""
+    latencies = []
+    for image in images:
+        started = time.perf_counter()
+        backend.image_to_string(image)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(backend.image_to_string, images))
+    throughput = len(images) / (time.perf_counter() - started)
+    return summarize(latencies), throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+
+    backends = {}
+    for name in args.backends:
+        try:
+            backends[name] = create_backend(name)
+        except Exception as e:
+            print(f"{name} unavailable: {e}")
+
+    print(f"{'backend':>12} {'size':>10} {'p50 ms':>8} {'p99 ms':>8} {'images/s':>9}")
+    for size in SIZES:
+        image = Image.open(io.BytesIO(render_text_image(size[1] // 30, size)))
+        image.load()
+        images = [image] * args.images
+        for name, backend in backends.items():
+            stats, throughput = measure(backend, images, args.threads)
+            print(
+                f"{name:>12} {size[0]:>4}x{size[1]:<5} {stats['p50_ms']:8.1f} "
+                f"{stats['p99_ms']:8.1f} {throughput:9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput and peak memory of the PDF text engines.
+
+Generates a corpus of text PDFs of several sizes and extracts each one with
+every engine. Each engine runs in a fresh process so its peak RSS is not
+mixed up with the others.
+
+Usage:
+    python -m benchmarks.pdf_engines --pages 10 100 500 --repeat 3
+"""
+
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import generate_pdf
+
+ENGINES = ["pymupdf", "pypdf2"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_engine(engine, files, repeat, queue):
+    """Extract every file repeat times with one engine and report the totals."""
+    from extractors.pdf_extractor import extract_text_from_pdf
+
+    baseline_rss = _peak_rss_mb()
+    pages = 0
+    characters = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for file_path, page_count in files:
+            characters += len(extract_text_from_pdf(file_path, engine))
+            pages += page_count
+    elapsed = time.perf_counter() - started
+    queue.put(
+        {
+            "engine": engine,
+            "pages_per_second": pages / elapsed,
+            "seconds": elapsed,
+            "characters": characters // repeat,
+            "peak_rss_mb": _peak_rss_mb(),
+            "rss_growth_mb": _peak_rss_mb() - baseline_rss,
+        }
+    )
+
+
+def benchmark(engine, files, repeat):
+    """Run one engine in a separate process and return its measurements."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_engine, args=(engine, files, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", type=int, default=[10, 100, 500])
+    parser.add_argument("--files", type=int, default=5, help="Files per size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for page_count in args.pages:
+            template = Path(work_dir) / f"{page_count}.pdf"
+            generate_pdf(template, page_count, with_images=False)
+            files = [(str(template), page_count)] * args.files
+
+            print(f"\n{page_count} pages x {args.files} files")
+            print(
+                f"{'engine':>8} {'pages/s':>10} {'seconds':>8} "
+                f"{'chars':>10} {'peak MB':>8} {'growth MB':>10}"
+            )
+            for engine in args.engines:
+                result = benchmark(engine, files, args.repeat)
+                print(
+                    f"{engine:>8} {result['pages_per_second']:10.1f} "
+                    f"{result['seconds']:8.2f} {result['characters']:10d} "
+                    f"{result['peak_rss_mb']:8.1f} {result['rss_growth_mb']:10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
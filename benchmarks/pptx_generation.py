@@ -0,0 +1,139 @@
+"""
+Throughput and peak memory of flashcard deck generation by deck size.
+
+Generates decks of several sizes with the cached slide templates used by
+/generate-pptx/ and, for comparison, by running the style function on every
+slide. Each run happens in a fresh process so its peak RSS is its own.
+
+Run from the repository root, where the style's overlay image lives.
+
+Usage:
+    python -m benchmarks.pptx_generation --cards 10 100 1000 5000 --repeat 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+
+from benchmarks.corpus import CORPUS_SEED, random_sentences
+
+ENGINES = ["template", "per-slide"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def flashcards(count, seed=CORPUS_SEED):
+    """Return count cards with short questions and answers of varying length."""
+    rng = random.Random(seed)
+    return [
+        {
+            "front": random_sentences(rng, 1)[0],
+            "back": " ".join(random_sentences(rng, 1 + card % 4)),
+        }
+        for card in range(count)
+    ]
+
+
+def _write_per_slide(cards, path, style):
+    """Write a deck by running the style function on every slide."""
+    from pptx import Presentation
+    from utils.create_ppts import style_advanced, styles
+
+    style_function = styles.get(style, style_advanced)
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]  # Blank layout
+    for card in cards:
+        style_function(presentation.slides.add_slide(layout), card["front"], True)
+        style_function(presentation.slides.add_slide(layout), card["back"], False)
+    presentation.save(path)
+
+
+def _run_engine(engine, count, repeat, style, queue):
+    """Generate a deck of count cards repeat times and report the totals."""
+    try:
+        from utils.create_ppts import deck_template, styles, write_pptx_from_flashcards
+
+        cards = flashcards(count)
+        # Style assets are loaded once per process, before the timed runs
+        deck_template(styles[style])
+        baseline_rss = _peak_rss_mb()
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, "deck.pptx")
+            started = time.perf_counter()
+            for _ in range(repeat):
+                if engine == "template":
+                    write_pptx_from_flashcards(cards, path, style)
+                else:
+                    _write_per_slide(cards, path, style)
+            elapsed = time.perf_counter() - started
+            deck_bytes = os.path.getsize(path)
+        queue.put(
+            {
+                "engine": engine,
+                "cards": count,
+                "slides_per_second": count * 2 * repeat / elapsed,
+                "seconds": elapsed / repeat,
+                "deck_mb": deck_bytes / (1024 * 1024),
+                "peak_rss_mb": _peak_rss_mb(),
+                "rss_growth_mb": _peak_rss_mb() - baseline_rss,
+            }
+        )
+    except Exception as e:
+        queue.put({"engine": engine, "cards": count, "error": str(e)})
+
+
+def benchmark(engine, count, repeat, style):
+    """Run one engine in a separate process and return its measurements."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_engine, args=(engine, count, repeat, style, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", nargs="+", type=int, default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    parser.add_argument("--style", default="advanced")
+    parser.add_argument(
+        "--per-slide-max-cards",
+        type=int,
+        default=1000,
+        help="Skip the per-slide engine on larger decks, which take minutes",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'cards':>6} {'engine':>10} {'slides/s':>10} {'seconds':>8} "
+        f"{'deck MB':>8} {'peak MB':>8} {'growth MB':>10}"
+    )
+    for count in args.cards:
+        for engine in args.engines:
+            if engine == "per-slide" and count > args.per_slide_max_cards:
+                continue
+            result = benchmark(engine, count, args.repeat, args.style)
+            if "error" in result:
+                print(f"{count:>6} {engine:>10} failed: {result['error']}")
+                continue
+            print(
+                f"{count:>6} {engine:>10} {result['slides_per_second']:10.1f} "
+                f"{result['seconds']:8.2f} {result['deck_mb']:8.2f} "
+                f"{result['peak_rss_mb']:8.1f} {result['rss_growth_mb']:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Extractor and API benchmarks over a deterministic synthetic corpus.
+
+Generates a text PDF, a PDF with images, a scanned PDF, a PPTX with images,
+a DOCX with tables and images and a large TXT, then extracts each one with
+and without OCR, directly and through the /extract and /extract-batch
+routes. Reports files and megabytes per second, latency percentiles and
+peak RSS, and writes everything to a JSON file that ``benchmarks.compare``
+checks against an earlier run.
+
+Every target runs in a fresh process so its peak RSS is its own, and the
+extraction and OCR caches are disabled so every run does the full work.
+
+Usage:
+    python -m benchmarks.suite --scale 0.5 --repeat 5 --output results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.corpus import CORPUS, generate_corpus
+from benchmarks.stats import summarize
+
+# Bumped whenever targets or measurements change meaning
+SUITE_VERSION = 1
+
+MODES = ["extract", "api", "api-batch"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _extract_once(mode, paths, enable_ocr, client):
+    """Extract paths once with one mode and return the characters extracted."""
+    if mode == "extract":
+        from api.start import extract_result
+
+        characters = 0
+        for path in paths:
+            result, status_code = extract_result(path, enable_ocr)
+            if status_code != 200:
+                raise RuntimeError(f"{path}: {result}")
+            characters += len(result.text)
+        return characters
+
+    data = {"enable_ocr": str(enable_ocr).lower()}
+    if mode == "api":
+        characters = 0
+        for path in paths:
+            with open(path, "rb") as file:
+                response = client.post(
+                    "/extract", files={"file": (Path(path).name, file)}, data=data
+                )
+            response.raise_for_status()
+            characters += len(response.json()["extracted_text"])
+        return characters
+
+    files = [open(path, "rb") for path in paths]
+    try:
+        response = client.post(
+            "/extract-batch",
+            files=[
+                ("files", (Path(path).name, file)) for path, file in zip(paths, files)
+            ],
+            data=data,
+        )
+    finally:
+        for file in files:
+            file.close()
+    response.raise_for_status()
+    results = response.json()[0]["results"]
+    failed = [result for result in results if result["status_code"] != 200]
+    if failed:
+        raise RuntimeError(f"{failed[0]['filename']}: {failed[0]['extracted_text']}")
+    return sum(len(result["extracted_text"]) for result in results)
+
+
+def _run_target(mode, paths, enable_ocr, repeat, queue):
+    """Measure one target in this process and put the measurements on queue."""
+    try:
+        client = None
+        if mode != "extract":
+            from fastapi.testclient import TestClient
+            from api.app import app
+
+            client = TestClient(app)
+
+        # The first run pays for imports and warm-up and is not measured
+        characters = _extract_once(mode, paths, enable_ocr, client)
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            _extract_once(mode, paths, enable_ocr, client)
+            latencies.append(time.perf_counter() - run_started)
+        elapsed = time.perf_counter() - started
+
+        megabytes = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+        queue.put(
+            {
+                **summarize(latencies),
+                "files_per_second": len(paths) * repeat / elapsed,
+                "mb_per_second": megabytes * repeat / elapsed,
+                "characters": characters,
+                "peak_rss_mb": _peak_rss_mb(),
+            }
+        )
+    except Exception as e:
+        queue.put({"error": str(e)})
+
+
+def run_target(mode, paths, enable_ocr, repeat):
+    """Run one target in a separate process and return its measurements."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_target, args=(mode, paths, enable_ocr, repeat, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _commit():
+    """Return the current git commit, or None outside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size factor")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--documents", nargs="+", default=list(CORPUS), choices=CORPUS)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--no-ocr", action="store_true", help="Skip the OCR runs")
+    parser.add_argument("--corpus-dir", help="Keep the generated corpus here")
+    parser.add_argument("--output", help="JSON file for the results")
+    args = parser.parse_args()
+
+    # Inherited by the spawned target processes
+    os.environ["EXTRACTION_CACHE"] = "0"
+    os.environ["OCR_CACHE"] = "0"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = args.corpus_dir or work_dir
+        corpus = generate_corpus(corpus_dir, args.scale, args.documents)
+
+        targets = []
+        for enable_ocr in [False] if args.no_ocr else [False, True]:
+            for mode in args.modes:
+                if mode == "api-batch":
+                    targets.append((mode, "all", enable_ocr))
+                    continue
+                for name in args.documents:
+                    # Plain text has nothing to OCR
+                    if not (enable_ocr and name == "txt"):
+                        targets.append((mode, name, enable_ocr))
+
+        print(
+            f"{'target':>28} {'files/s':>8} {'MB/s':>8} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8}"
+        )
+        results = []
+        for mode, name, enable_ocr in targets:
+            paths = [
+                corpus[document]["path"]
+                for document in (args.documents if name == "all" else [name])
+            ]
+            target = f"{mode}:{name}" + (":ocr" if enable_ocr else "")
+            measurements = run_target(mode, paths, enable_ocr, args.repeat)
+            results.append({"target": target, **measurements})
+            if "error" in measurements:
+                print(f"{target:>28} failed: {measurements['error']}")
+                continue
+            print(
+                f"{target:>28} {measurements['files_per_second']:8.2f} "
+                f"{measurements['mb_per_second']:8.2f} "
+                f"{measurements['p50_ms']:9.1f} {measurements['p95_ms']:9.1f} "
+                f"{measurements['p99_ms']:9.1f} {measurements['peak_rss_mb']:8.1f}"
+            )
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "ocr_backend": os.environ.get("OCR_BACKEND", "auto"),
+            "extraction_backend": os.environ.get("EXTRACTION_BACKEND", "thread"),
+        },
+        "corpus": {
+            name: {"bytes": document["bytes"], "sha256": document["sha256"]}
+            for name, document in corpus.items()
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
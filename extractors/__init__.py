@@ -0,0 +1 @@
+EXTRACTOR_VERSION = "1.4.1"
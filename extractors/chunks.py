@@ -0,0 +1,16 @@
+from typing import NamedTuple
+
+
+class Chunk(NamedTuple):
+    """A piece of extracted text, yielded as soon as it is produced."""
+
+    # "page", "slide", "paragraph", "header", "footer", "ocr" or "text"
+    kind: str
+    # 1-based page, slide or paragraph number the text belongs to
+    number: int
+    text: str
+
+
+def join_chunks(chunks):
+    """Join the text of a chunk iterable into one string."""
+    return "".join(chunk.text for chunk in chunks)
@@ -0,0 +1,103 @@
+"""
+Cheap estimates of what an extraction will cost, for admission control.
+
+An estimate only looks at what ``inspect_source`` reads from the container:
+the type told by the content, the page count and image count of a PDF from
+its page tree, the slide and media entries of a zip-based document, the
+header of an image. It never extracts text, so it costs a small fraction of
+the extraction it describes. Callers that cannot afford to open every file
+can estimate from the size and extension alone.
+"""
+
+import os
+from typing import NamedTuple
+from extractors.registry import get_extractor
+from extractors.sniff import inspect_source
+from extractors.source import BYTES_TYPES, is_path, open_stream, source_size
+
+# Memory every extraction needs besides its document
+JOB_BASE_BYTES = int(os.environ.get("COST_JOB_BASE_BYTES", 16 * 1024 * 1024))
+
+# Memory of decoding and OCR'ing one page render or embedded image
+OCR_IMAGE_BYTES = int(os.environ.get("COST_OCR_IMAGE_BYTES", 64 * 1024 * 1024))
+
+# Peak memory per byte of input while parsing, by extractor
+MEMORY_PER_INPUT_BYTE = {"pdf": 2, "pptx": 3, "docx": 2, "image": 1, "txt": 0}
+
+
+class JobCost(NamedTuple):
+    """Estimated peak memory of an extraction and what it was estimated from."""
+
+    memory_bytes: int
+    input_bytes: int = 0
+    pages: int = 0
+    images: int = 0
+    ocr: bool = False
+
+
+def _image_pixels(source):
+    from PIL import Image
+
+    with Image.open(open_stream(source)) as image:
+        width, height = image.size
+    return width * height
+
+
+def _estimate_from_name(source, filename, enable_ocr, input_bytes):
+    extractor = get_extractor(filename or source)
+    name = extractor.name if extractor else None
+    memory = JOB_BASE_BYTES + input_bytes * MEMORY_PER_INPUT_BYTE.get(name, 2)
+    if name == "txt":
+        from extractors.txt_extractor import TXT_CHUNK_BYTES
+
+        memory = JOB_BASE_BYTES + min(input_bytes, TXT_CHUNK_BYTES) * 4
+    # Without an image count, any document OCR'd may hold an image
+    if name == "image" or (enable_ocr and name in ("pdf", "pptx", "docx")):
+        memory += OCR_IMAGE_BYTES
+    return JobCost(memory, input_bytes, ocr=enable_ocr)
+
+
+def estimate_cost(source, filename=None, enable_ocr=False, info=None, inspect=True):
+    """
+    Estimate the peak memory of extracting a source.
+
+    ``info`` is the source's DocumentInfo when the caller already inspected
+    it. Unknown formats and sources that cannot be inspected are estimated
+    from their size alone. With ``inspect`` False the source is not opened
+    at all: the estimate uses its size and the extractor its name is for.
+    """
+    input_bytes = source_size(source) or 0
+    if not inspect and info is None:
+        return _estimate_from_name(source, filename, enable_ocr, input_bytes)
+    try:
+        # Images only matter when they are OCR'd
+        info = info or inspect_source(source, filename, enable_ocr, text_layer=False)
+    except Exception:
+        # The extraction reports unreadable files; estimate from the size
+        info = None
+    name = info.extractor if info else None
+    memory = JOB_BASE_BYTES + input_bytes * MEMORY_PER_INPUT_BYTE.get(name, 2)
+    pages = (info.pages if info else None) or 0
+    images = (info.images if info else None) or 0
+    if name == "pdf" and enable_ocr:
+        # Scanned pages are rendered for OCR even without embedded images
+        images = max(images, 1)
+    elif name == "image":
+        try:
+            # Decoded RGBA pixels, plus the grayscale copy OCR works on
+            memory = JOB_BASE_BYTES + _image_pixels(source) * 5
+        except Exception:
+            pass
+        finally:
+            if not is_path(source) and not isinstance(source, BYTES_TYPES):
+                source.seek(0)
+    elif name == "txt":
+        from extractors.txt_extractor import TXT_CHUNK_BYTES
+
+        # Decoded a block at a time, whatever the file size
+        memory = JOB_BASE_BYTES + min(input_bytes, TXT_CHUNK_BYTES) * 4
+
+    if images and (enable_ocr or name == "image"):
+        # Images are OCR'd one at a time
+        memory += OCR_IMAGE_BYTES
+    return JobCost(memory, input_bytes, pages, images, enable_ocr)
@@ -1,41 +1,252 @@
-from docx import Document
-from PIL import Image
-import pytesseract
 import io
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
+from extractors.chunks import Chunk, join_chunks
+from extractors.ocr import ocr_image_bytes
+from extractors.ocr_plan import OcrPlanner
+from extractors.source import open_stream, source_name
+from utils.metrics import stage
 
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+V = "{urn:schemas-microsoft-com:vml}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
 
-def extract_text_from_docx(file_path):
-    """Extract text from a DOCX."""
-    text = ""
+# Text of run-level elements other than w:t, as python-docx renders them
+RUN_TEXT = {W + "tab": "\t", W + "br": "\n", W + "cr": "\n"}
+
+# Elements holding the paragraphs and tables of a document, header or footer
+PART_BODIES = {W + "body", W + "hdr", W + "ftr"}
+
+# Elements whose text is gathered before it is emitted
+CONTAINERS = {W + "p", W + "tc", W + "tr"}
+
+
+def _relationships(archive, part_name):
+    """Return the relationships of a part as ``{id: (type, target part)}``."""
+    directory, name = posixpath.split(part_name)
     try:
-        doc = Document(file_path)
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        rels_file = archive.open(posixpath.join(directory, "_rels", name + ".rels"))
+    except KeyError:
+        return {}
+
+    relationships = {}
+    with rels_file:
+        for _, element in iterparse(rels_file):
+            if element.tag != RELS + "Relationship":
+                continue
+            if element.get("TargetMode") == "External":
+                continue
+            target = element.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(directory, target))
+            rel_type = element.get("Type").rpartition("/")[2]
+            relationships[element.get("Id")] = (rel_type, target)
+    return relationships
+
+
+def _iter_blocks(part_file, images):
+    """
+    Yield the text of every paragraph and table row of a part, in order.
+
+    One iterparse pass keeps a stack of the paragraphs, table cells and rows
+    being read: cells gather their paragraphs, rows their cells (joined by
+    tabs), and the rows of a nested table end up in the enclosing cell.
+    Paragraphs of text boxes are yielded on their own, and the VML fallback
+    copies of drawings are skipped. The relationship ids of the images
+    referenced are appended to ``images``. Elements are cleared once read,
+    so memory does not grow with the part.
+    """
+    body = None
+    stack = []
+    fallback_depth = 0
+    for event, element in iterparse(part_file, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag in PART_BODIES:
+                body = element
+            elif tag == MC + "Fallback":
+                fallback_depth += 1
+            elif tag in CONTAINERS and not fallback_depth:
+                stack.append((tag, []))
+            continue
+
+        if tag == MC + "Fallback":
+            fallback_depth -= 1
+            continue
+        if fallback_depth:
+            continue
+
+        if tag == W + "t" or tag in RUN_TEXT:
+            if stack and stack[-1][0] == W + "p":
+                stack[-1][1].append(
+                    (element.text or "") if tag == W + "t" else RUN_TEXT[tag]
+                )
+        elif tag == A + "blip" or tag == V + "imagedata":
+            image = element.get(R + "embed") or element.get(R + "id")
+            if image:
+                images.append(image)
+        elif tag in CONTAINERS:
+            _, pieces = stack.pop()
+            if tag == W + "p":
+                text = "".join(pieces)
+            elif tag == W + "tc":
+                text = " ".join(piece for piece in pieces if piece)
+            else:
+                text = "\t".join(pieces)
+
+            parent = stack[-1][0] if stack else None
+            if tag == W + "tc":
+                if parent == W + "tr":
+                    stack[-1][1].append(text)
+            elif parent == W + "tc":
+                # Paragraphs and nested table rows belong to their cell
+                stack[-1][1].append(text)
+            else:
+                yield text
+            element.clear()
+            if not stack and body is not None:
+                body.clear()
+
+
+def _iter_text(archive, image_chunks=None):
+    """
+    Yield the chunks of an open DOCX: headers, then the body, then footers.
+
+    Body paragraphs and table rows are numbered together, as are the
+    paragraphs of all headers and of all footers. With ``image_chunks``,
+    ``image_chunks(member, number)`` is called once for the zip member of
+    every image referenced, in document order, and the chunks it yields
+    follow the paragraph or row numbered ``number`` that references it.
+    """
+    main_part = "word/document.xml"
+    for rel_type, target in _relationships(archive, "").values():
+        if rel_type == "officeDocument":
+            main_part = target
+    relationships = _relationships(archive, main_part)
+    parts = [
+        ("header", target)
+        for kind, target in relationships.values()
+        if kind == "header"
+    ]
+    parts.append(("paragraph", main_part))
+    parts += [
+        ("footer", target)
+        for kind, target in relationships.values()
+        if kind == "footer"
+    ]
+
+    numbers = {}
+    seen_images = set()
+
+    def referenced_images(part_images, part_relationships, number):
+        # Images found since the last block belong to the block just read
+        for image_id in part_images:
+            rel_type, target = part_relationships.get(image_id, (None, None))
+            if rel_type == "image" and target not in seen_images:
+                seen_images.add(target)
+                yield from image_chunks(target, number)
+        part_images.clear()
+
+    for kind, part_name in parts:
+        part_images = []
+        part_relationships = None
+        if image_chunks is not None:
+            part_relationships = (
+                relationships
+                if part_name == main_part
+                else _relationships(archive, part_name)
+            )
+        with archive.open(part_name) as part_file:
+            blocks = _iter_blocks(part_file, part_images)
+            while True:
+                with stage("parse"):
+                    text = next(blocks, None)
+                if text is None:
+                    break
+                numbers[kind] = numbers.get(kind, 0) + 1
+                yield Chunk(kind, numbers[kind], text + "\n")
+                if part_images and image_chunks is not None:
+                    yield from referenced_images(
+                        part_images, part_relationships, numbers[kind]
+                    )
+        if part_images and image_chunks is not None:
+            yield from referenced_images(
+                part_images, part_relationships, numbers.get(kind, 0)
+            )
+
+
+def iter_text_from_docx(source):
+    """
+    Yield the text of a DOCX one paragraph or table row at a time.
+
+    ``source`` is a path, bytes-like content or a binary file object. The
+    XML parts are streamed straight from the zip instead of being loaded
+    into a python-docx document.
+    """
+    try:
+        with stage("open"):
+            archive = zipfile.ZipFile(open_stream(source))
+        with archive:
+            yield from _iter_text(archive)
     except Exception as e:
-        print(f"Error reading DOCX: {e}")
-    return text
+        raise RuntimeError(f"Failed to extract text from DOCX: {e}")
 
 
-def extract_text_and_images_from_docx(file_path):
-    """Extract text and perform OCR on images in a DOCX."""
-    text = ""
+def extract_text_from_docx(source):
+    """Extract text from a DOCX."""
+    return join_chunks(iter_text_from_docx(source))
+
+
+def _image_size(image_data):
+    """Return the pixel size of an image, or (None, None) if unknown."""
+    from PIL import Image
+
+    try:
+        # Only the header is read to get the size
+        return Image.open(io.BytesIO(image_data)).size
+    except Exception:
+        # Formats PIL cannot parse (EMF, WMF, ...) are still OCR'd
+        return None, None
+
+
+def iter_text_and_images_from_docx(source):
+    """
+    Yield the text of a DOCX with the OCR output of each image after the
+    paragraph or table row that first references it.
+
+    OCR chunks carry the number of that paragraph or row, so like the OCR
+    of a PDF page they fall in its ``page_range``.
+    """
+    seen_images = {}
+    planner = OcrPlanner()
+
+    def image_chunks(image_name, number):
+        with stage("image_decode"):
+            image_data = archive.read(image_name)
+            width, height = _image_size(image_data)
+        if not planner.should_ocr_image(image_name, width, height):
+            return
+
+        # Perform OCR on the image
+        ocr_text = ocr_image_bytes(image_data, seen_images)
+        yield Chunk("ocr", number, f"\nOCR from Embedded Image:\n{ocr_text}\n")
+
     try:
-        document = Document(file_path)
-
-        # Extract text from paragraphs
-        for paragraph in document.paragraphs:
-            text += paragraph.text + "\n"
-
-        # Extract images from the document
-        for rel in document.part.rels.values():
-            if "image" in rel.target_ref:
-                image_data = rel.target_part.blob
-                image_stream = io.BytesIO(image_data)
-                pil_image = Image.open(image_stream)
-
-                # Perform OCR on the image
-                ocr_text = pytesseract.image_to_string(pil_image)
-                text += f"\nOCR from Embedded Image:\n{ocr_text}\n"
+        with stage("open"):
+            archive = zipfile.ZipFile(open_stream(source))
+        with archive:
+            yield from _iter_text(archive, image_chunks)
+        planner.report(source_name(source))
     except Exception as e:
         raise RuntimeError(f"Failed to extract text and images from DOCX: {e}")
-    return text
+
+
+def extract_text_and_images_from_docx(source):
+    """Extract text and perform OCR on images in a DOCX."""
+    return join_chunks(iter_text_and_images_from_docx(source))
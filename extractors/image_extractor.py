@@ -1,11 +1,26 @@
-from PIL import Image
-import pytesseract
+from contextlib import ExitStack
+from extractors.chunks import Chunk, join_chunks
+from extractors.ocr import ocr_image_bytes
+from extractors.source import open_bytes
+from utils.metrics import stage
 
 
-def extract_text_from_image(file_path):
-    """Extract text from an image using OCR."""
+def iter_text_from_image(source):
+    """
+    Yield the OCR output of an image.
+
+    ``source`` is a path, bytes-like content or a binary file object; large
+    image files are memory-mapped rather than read.
+    """
     try:
-        image = Image.open(file_path)
-        return pytesseract.image_to_string(image)
+        with ExitStack() as stack:
+            with stage("open"):
+                image_bytes = stack.enter_context(open_bytes(source))
+            yield Chunk("ocr", 1, ocr_image_bytes(image_bytes))
     except Exception as e:
         raise RuntimeError(f"Failed to extract text from image: {e}")
+
+
+def extract_text_from_image(source):
+    """Extract text from an image using OCR."""
+    return join_chunks(iter_text_from_image(source))
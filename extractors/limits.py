@@ -0,0 +1,106 @@
+import time
+from typing import NamedTuple
+
+
+class ExtractionLimits(NamedTuple):
+    """
+    Limits that stop an extraction early.
+
+    ``pages`` holds 1-based ``(first, last)`` ranges of PDF pages or PPTX
+    slides, with ``last`` None for "to the end"; formats without pages
+    ignore it. ``max_chars`` and ``timeout`` (seconds) apply to every format
+    and cut the result off at the chunk that crosses them.
+    """
+
+    pages: tuple = ()
+    max_chars: int = None
+    timeout: float = None
+
+    @classmethod
+    def parse(cls, pages=None, max_chars=None, timeout=None):
+        """
+        Build limits from user input such as ``pages="1-3,7,10-"``.
+
+        Returns None when no limit is set; raises ValueError for bad input.
+        """
+        if max_chars is not None and max_chars < 0:
+            raise ValueError("max_chars must not be negative")
+        if timeout is not None and timeout <= 0:
+            raise ValueError("timeout must be positive")
+        limits = cls(parse_pages(pages) if pages else (), max_chars, timeout)
+        return limits if limits != cls() else None
+
+
+def parse_pages(spec):
+    """Parse a page spec like ``"1-3,7,10-"`` into ``(first, last)`` ranges."""
+    ranges = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        try:
+            first = int(first)
+            last = (int(last) if last.strip() else None) if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part}")
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part}")
+        ranges.append((first, last))
+    if not ranges:
+        raise ValueError(f"Invalid page range: {spec}")
+    return tuple(ranges)
+
+
+def selected_pages(pages, page_count):
+    """Return the 0-based indexes of the selected pages, in document order."""
+    if not pages:
+        return list(range(page_count))
+    selected = set()
+    for first, last in pages:
+        stop = page_count if last is None else min(last, page_count)
+        selected.update(range(first - 1, stop))
+    return sorted(selected)
+
+
+class LimitedChunks:
+    """
+    Iterate over chunks until a character or time budget runs out.
+
+    Once a limit is hit the last chunk is cut to fit, the underlying
+    generator is closed so the extractor stops working, and ``truncated``
+    is set to ``"max_chars"`` or ``"timeout"``. Text that fills max_chars
+    exactly counts as truncated, since finding out whether more follows
+    would mean extracting the next chunk.
+    """
+
+    def __init__(self, chunks, max_chars=None, timeout=None):
+        self._chunks = chunks
+        self.max_chars = max_chars
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.truncated = None
+        self._chars = 0
+
+    def __iter__(self):
+        try:
+            for chunk in self._chunks:
+                if self.max_chars is not None:
+                    remaining = self.max_chars - self._chars
+                    if len(chunk.text) > remaining:
+                        if remaining:
+                            yield chunk._replace(text=chunk.text[:remaining])
+                        self.truncated = "max_chars"
+                        return
+                    self._chars += len(chunk.text)
+                yield chunk
+                if self.max_chars is not None and self._chars >= self.max_chars:
+                    # Stop before the extractor works on a chunk that is cut
+                    self.truncated = "max_chars"
+                    return
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.truncated = "timeout"
+                    return
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
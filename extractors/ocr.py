@@ -0,0 +1,208 @@
+import io
+import logging
+import mmap
+import os
+import queue
+import threading
+from extractors import EXTRACTOR_VERSION
+from extractors.preprocess import draft, preprocess_image, preprocess_settings
+from utils.cache import TieredCache, hash_bytes, make_key
+from utils.metrics import stage
+
+logger = logging.getLogger("TextExtractor")
+
+# "tesserocr" keeps libtesseract loaded in-process, "pytesseract" runs the
+# tesseract binary per image, "auto" prefers tesserocr when it is installed
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_BACKENDS = ["auto", "tesserocr", "pytesseract"]
+OCR_LANGUAGE = os.environ.get("OCR_LANGUAGE", "eng")
+
+# Long-lived tesseract engines per process; each OCRs one image at a time
+OCR_POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE", os.cpu_count() or 1))
+
+# OCR output is cached by image content, so logos and template backgrounds
+# shared by many documents are only recognised once
+OCR_CACHE_ENABLED = os.environ.get("OCR_CACHE", "1") == "1"
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", "cache/ocr")
+OCR_CACHE_MEMORY_BYTES = int(os.environ.get("OCR_CACHE_MEMORY_BYTES", 16 * 1024 * 1024))
+OCR_CACHE_DISK_BYTES = int(os.environ.get("OCR_CACHE_DISK_BYTES", 256 * 1024 * 1024))
+
+ocr_cache = TieredCache(
+    OCR_CACHE_DIR if OCR_CACHE_ENABLED else None,
+    OCR_CACHE_MEMORY_BYTES if OCR_CACHE_ENABLED else 0,
+    OCR_CACHE_DISK_BYTES if OCR_CACHE_ENABLED else 0,
+    name="ocr_cache",
+)
+
+
+class PytesseractBackend:
+    """Run the tesseract binary for every image through pytesseract."""
+
+    name = "pytesseract"
+
+    def __init__(self, language=OCR_LANGUAGE):
+        self.language = language
+
+    def image_to_string(self, image):
+        import pytesseract
+
+        return pytesseract.image_to_string(image, lang=self.language)
+
+
+class TesserocrBackend:
+    """
+    Recognise images with a pool of long-lived libtesseract engines.
+
+    Images are handed to tesseract as raw pixel buffers, so there is no
+    subprocess and no temporary image file per call.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, pool_size=OCR_POOL_SIZE, language=OCR_LANGUAGE):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.pool_size = pool_size
+        self.language = language
+        self._engines = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Create the first engine now so a missing install fails early
+        self._engines.put(self._create_engine())
+
+    def _create_engine(self):
+        self._created += 1
+        return self._tesserocr.PyTessBaseAPI(lang=self.language)
+
+    def _acquire(self):
+        try:
+            return self._engines.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                return self._create_engine()
+        return self._engines.get()
+
+    def image_to_string(self, image):
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        bytes_per_pixel = 1 if image.mode == "L" else 3
+        engine = self._acquire()
+        try:
+            engine.SetImageBytes(
+                image.tobytes(),
+                image.width,
+                image.height,
+                bytes_per_pixel,
+                image.width * bytes_per_pixel,
+            )
+            if "dpi" in image.info:
+                engine.SetSourceResolution(int(image.info["dpi"][0]))
+            return engine.GetUTF8Text()
+        finally:
+            engine.Clear()
+            self._engines.put(engine)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=OCR_BACKEND):
+    """Create an OCR backend by name."""
+    if name == "tesserocr":
+        return TesserocrBackend()
+    elif name == "pytesseract":
+        return PytesseractBackend()
+    elif name == "auto":
+        try:
+            return TesserocrBackend()
+        # ValueError: imported off the main thread, see init_backend
+        except (ImportError, RuntimeError, ValueError) as e:
+            logger.warning(f"tesserocr unavailable ({e}), using pytesseract")
+            return PytesseractBackend()
+    raise ValueError(
+        f"Unsupported OCR backend: {name}. Expected one of {', '.join(OCR_BACKENDS)}"
+    )
+
+
+def get_backend():
+    """
+    Return the OCR backend shared by this process, creating it on first use.
+
+    tesserocr can only be imported on the main thread, so processes that
+    OCR on worker threads call init_backend at start-up.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(OCR_BACKEND)
+        return _backend
+
+
+def init_backend():
+    """
+    Create this process's OCR backend now, on the calling (main) thread.
+
+    Raises when OCR_BACKEND names a backend that cannot be created; "auto"
+    falls back to pytesseract with a warning.
+    """
+    return get_backend()
+
+
+def ocr_settings():
+    """Return the OCR settings, for use in cache keys."""
+    return (OCR_BACKEND, OCR_LANGUAGE, preprocess_settings())
+
+
+def ocr_provenance():
+    """Describe the OCR engine behind OCR'd text, for extraction results."""
+    return {"backend": get_backend().name, "language": OCR_LANGUAGE}
+
+
+def image_to_string(image):
+    """Perform OCR on a PIL image with the configured backend."""
+    return get_backend().image_to_string(image)
+
+
+def ocr_image_bytes(image_bytes, seen=None):
+    """
+    Perform OCR on encoded image bytes, reusing earlier results for the same image.
+
+    ``seen`` is an optional dict shared by the calls for one document, so an
+    image repeated inside it is recognised once even with the cache disabled.
+    """
+    image_hash = hash_bytes(image_bytes)
+    if seen is not None and image_hash in seen:
+        return seen[image_hash]
+
+    cache_key = make_key(
+        image_hash,
+        get_backend().name,
+        OCR_LANGUAGE,
+        preprocess_settings(),
+        EXTRACTOR_VERSION,
+    )
+    ocr_text = ocr_cache.get(cache_key)
+    if ocr_text is None:
+        from PIL import Image
+
+        with stage("image_decode"):
+            # A memory-mapped file is read by PIL in place instead of copied
+            if isinstance(image_bytes, mmap.mmap):
+                image = Image.open(image_bytes)
+            else:
+                image = Image.open(io.BytesIO(image_bytes))
+            draft(image)
+            image.load()
+        with stage("preprocess"):
+            image = preprocess_image(image)
+        with stage("ocr"):
+            ocr_text = image_to_string(image)
+        ocr_cache.set(cache_key, ocr_text)
+
+    if seen is not None:
+        seen[image_hash] = ocr_text
+    return ocr_text
@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+from utils.metrics import collecting_counts, count, register_counts
+
+logger = logging.getLogger("TextExtractor")
+
+# Images whose width or height is below this many pixels (icons, bullets,
+# rules) are not worth an OCR call
+OCR_MIN_IMAGE_SIZE = int(os.environ.get("OCR_MIN_IMAGE_SIZE", 32))
+
+# Pages or slides whose text layer already has this many characters skip
+# OCR of their images; 0 disables the check
+OCR_TEXT_DENSITY_THRESHOLD = int(os.environ.get("OCR_TEXT_DENSITY_THRESHOLD", 2000))
+
+# OCR an image referenced several times in one document only once
+OCR_DEDUPLICATE = os.environ.get("OCR_DEDUPLICATE", "1") == "1"
+
+# Render PDF pages without a text layer and OCR them in one call instead of
+# OCRing each embedded image
+OCR_RENDER_IMAGE_ONLY_PAGES = os.environ.get("OCR_RENDER_IMAGE_ONLY_PAGES", "1") == "1"
+OCR_RENDER_DPI = int(os.environ.get("OCR_RENDER_DPI", 300))
+
+STAT_NAMES = [
+    "ocr_calls",
+    "rendered_pages",
+    "skipped_small",
+    "skipped_text_layer",
+    "skipped_duplicate",
+    "skipped_by_render",
+]
+
+_totals = dict.fromkeys(STAT_NAMES, 0)
+_totals_lock = threading.Lock()
+
+
+def ocr_plan_settings():
+    """Return the planning settings, for use in cache keys."""
+    return (
+        OCR_MIN_IMAGE_SIZE,
+        OCR_TEXT_DENSITY_THRESHOLD,
+        OCR_DEDUPLICATE,
+        OCR_RENDER_IMAGE_ONLY_PAGES,
+        OCR_RENDER_DPI,
+    )
+
+
+def _add_totals(stats):
+    with _totals_lock:
+        for name in STAT_NAMES:
+            _totals[name] += stats.get(name, 0)
+
+
+register_counts("ocr_plan", _add_totals)
+
+
+def ocr_plan_totals():
+    """Return OCR calls made and skipped across all documents so far."""
+    with _totals_lock:
+        return dict(_totals)
+
+
+class OcrPlanner:
+    """
+    Decide which images of one document are worth sending to OCR.
+
+    Extractors ask the planner page by page (or slide by slide) and the
+    planner counts every OCR call it lets through or skips.
+    """
+
+    def __init__(
+        self,
+        min_image_size=OCR_MIN_IMAGE_SIZE,
+        text_density_threshold=OCR_TEXT_DENSITY_THRESHOLD,
+        deduplicate=OCR_DEDUPLICATE,
+        render_image_only_pages=OCR_RENDER_IMAGE_ONLY_PAGES,
+        render_dpi=OCR_RENDER_DPI,
+    ):
+        self.min_image_size = min_image_size
+        self.text_density_threshold = text_density_threshold
+        self.deduplicate = deduplicate
+        self.render_image_only_pages = render_image_only_pages
+        self.render_dpi = render_dpi
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+        self._seen_images = set()
+
+    def should_render_page(self, page_text, image_count):
+        """Return True if a page has images but no text layer at all."""
+        if not self.render_image_only_pages or not image_count:
+            return False
+        if page_text.strip():
+            return False
+        self.stats["rendered_pages"] += 1
+        self.stats["ocr_calls"] += 1
+        self.stats["skipped_by_render"] += image_count
+        return True
+
+    def should_skip_page_images(self, page_text, image_count):
+        """Return True if the text layer is dense enough to make OCR redundant."""
+        if not self.text_density_threshold or not image_count:
+            return False
+        if len(page_text.strip()) < self.text_density_threshold:
+            return False
+        self.stats["skipped_text_layer"] += image_count
+        return True
+
+    def should_ocr_image(self, image_id, width, height):
+        """
+        Return True if an image should be OCR'd.
+
+        ``image_id`` identifies the image within the document (an xref or a
+        content hash); ``width`` and ``height`` are in pixels, or None when
+        unknown.
+        """
+        if self.deduplicate:
+            if image_id in self._seen_images:
+                self.stats["skipped_duplicate"] += 1
+                return False
+            self._seen_images.add(image_id)
+        if width is not None and height is not None:
+            if min(width, height) < self.min_image_size:
+                self.stats["skipped_small"] += 1
+                return False
+        self.stats["ocr_calls"] += 1
+        return True
+
+    def merge(self, stats):
+        """Add the counters of a planner that ran in another worker."""
+        for name in STAT_NAMES:
+            self.stats[name] += stats[name]
+
+    def skipped(self):
+        """Return the number of OCR calls the plan avoided."""
+        return sum(
+            self.stats[name] for name in STAT_NAMES if name.startswith("skipped_")
+        )
+
+    def report(self, file_path):
+        """
+        Log this document's plan and add it to the running totals, or to the
+        counts of the extraction when they are collected (see utils.metrics).
+        """
+        if collecting_counts():
+            for name in STAT_NAMES:
+                count("ocr_plan", name, self.stats[name])
+        else:
+            _add_totals(self.stats)
+        logger.info(
+            f"OCR plan for {file_path}: {self.stats['ocr_calls']} OCR calls, "
+            f"{self.skipped()} skipped ({self.stats['skipped_small']} small, "
+            f"{self.stats['skipped_text_layer']} on text pages, "
+            f"{self.stats['skipped_duplicate']} duplicates, "
+            f"{self.stats['skipped_by_render']} replaced by page renders)"
+        )
@@ -1,51 +1,304 @@
-from PyPDF2 import PdfReader
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-import io
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import multiprocessing.util
 import os
+import tempfile
+import threading
+from contextlib import nullcontext
+from extractors.chunks import Chunk, join_chunks
+from extractors.limits import selected_pages
+from extractors.ocr import ocr_image_bytes
+from extractors.ocr_plan import OcrPlanner
+from extractors.source import (
+    BYTES_TYPES,
+    is_path,
+    open_bytes,
+    open_stream,
+    source_name,
+    source_path,
+)
+from utils.metrics import collect, collect_counts, merge, merge_counts, stage
 
+# Text engine for PDFs without OCR: "pymupdf", "pypdf2", or "auto" which uses
+# PyMuPDF and falls back to PyPDF2 for files PyMuPDF cannot open
+PDF_TEXT_ENGINE = os.environ.get("PDF_TEXT_ENGINE", "auto")
+
+PDF_TEXT_ENGINES = ["auto", "pymupdf", "pypdf2"]
+
+# Worker processes used to OCR the pages of a single PDF; 1 keeps it sequential
+PDF_PAGE_WORKERS = int(os.environ.get("PDF_PAGE_WORKERS", 1))
+
+# Page ranges handed out per worker, so uneven pages still balance out
+RANGES_PER_WORKER = 4
+
+_page_executors = {}
+_page_executors_lock = threading.Lock()
+
+
+def _normalize_page_text(text):
+    """Lay out page text the same way for every engine: one trailing newline."""
+    text = text.rstrip()
+    return text + "\n" if text else ""
+
+
+def _open_pdf(source):
+    """Open a PDF with PyMuPDF from a path, bytes or a binary file object."""
+    # Imported here so reading PDF_TEXT_ENGINE does not load PyMuPDF
+    import fitz
+
+    # Files on disk are read by MuPDF as it needs them instead of copied
+    path = source_path(source)
+    if path is not None:
+        return fitz.open(path)
+    if isinstance(source, BYTES_TYPES):
+        return fitz.open(stream=source, filetype="pdf")
+    source.seek(0)
+    return fitz.open(stream=source.read(), filetype="pdf")
+
+
+def iter_text_from_pdf(source, engine=None, pages=None):
+    """
+    Yield the text of a PDF one page at a time.
+
+    ``source`` is a path, bytes-like content or a binary file object.
+    ``pages`` limits extraction to some page ranges (see ExtractionLimits);
+    other pages are never parsed.
+    """
+    engine = engine or PDF_TEXT_ENGINE
+    if engine not in PDF_TEXT_ENGINES:
+        raise ValueError(f"Unsupported PDF text engine: {engine}")
 
-def extract_text_from_pdf(file_path):
-    """Extract text from a PDF file."""
     try:
-        text = ""
-        with open(file_path, "rb") as file:
-            reader = PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text()
-        return text
+        if engine in ("auto", "pymupdf"):
+            try:
+                with stage("open"):
+                    pdf_document = _open_pdf(source)
+            except Exception:
+                if engine == "pymupdf":
+                    raise
+                pdf_document = None
+
+            if pdf_document is not None:
+                with pdf_document:
+                    for index in selected_pages(pages, len(pdf_document)):
+                        with stage("parse"):
+                            page_text = _normalize_page_text(
+                                pdf_document[index].get_text("text")
+                            )
+                        yield Chunk("page", index + 1, page_text)
+                return
+
+        from PyPDF2 import PdfReader
+
+        stream = open_stream(source)
+        with open(stream, "rb") if is_path(stream) else nullcontext(stream) as file:
+            with stage("open"):
+                reader = PdfReader(file)
+            for index in selected_pages(pages, len(reader.pages)):
+                with stage("parse"):
+                    page_text = _normalize_page_text(reader.pages[index].extract_text())
+                yield Chunk("page", index + 1, page_text)
     except Exception as e:
         raise RuntimeError(f"Failed to extract text from PDF: {e}")
 
 
-def extract_text_and_images_from_pdf(file_path):
-    """Extract text and images with OCR from a PDF."""
-    text = ""
+def extract_text_from_pdf(source, engine=None, pages=None):
+    """Extract text from a PDF file."""
+    return join_chunks(iter_text_from_pdf(source, engine, pages))
+
+
+def _plan_page(planner, page_text, image_list):
+    """
+    Return "render" to OCR a page as one rendered image, or the
+    (index, xref) of each of its images to OCR.
+    """
+    if planner.should_render_page(page_text, len(image_list)):
+        return "render"
+    if planner.should_skip_page_images(page_text, len(image_list)):
+        return []
+    return [
+        (img_index, img[0])
+        for img_index, img in enumerate(image_list)
+        if planner.should_ocr_image(img[0], img[2], img[3])
+    ]
+
+
+def _iter_pages(source, page_indexes, planner, plans=None):
+    """
+    Yield text and OCR output for the given 0-based pages of a PDF.
+
+    ``plans`` maps pages to what ``_plan_page`` returned for them when the
+    document was planned up front; otherwise each page is planned as it is
+    read.
+    """
+    seen_images = {}
+    # Each worker opens the document itself instead of receiving page objects
+    with stage("open"):
+        pdf_document = _open_pdf(source)
     try:
-        # Open the PDF file
-        pdf_document = fitz.open(file_path)
+        for page_number in page_indexes:
+            with stage("parse"):
+                page = pdf_document[page_number]
 
-        for page_number in range(len(pdf_document)):
-            page = pdf_document[page_number]
+                # Extract text from the page
+                page_text = page.get_text("text")
+                if plans is None:
+                    plan = _plan_page(planner, page_text, page.get_images(full=True))
+                else:
+                    plan = plans[page_number]
+            yield Chunk(
+                "page",
+                page_number + 1,
+                f"Page {page_number + 1}:\n" + page_text + "\n",
+            )
 
-            # Extract text from the page
-            text += f"Page {page_number + 1}:\n"
-            text += page.get_text("text") + "\n"
+            # Scanned pages are OCR'd as one rendered image
+            if plan == "render":
+                with stage("image_decode"):
+                    pixmap = page.get_pixmap(dpi=planner.render_dpi)
+                    image_bytes = pixmap.tobytes("png")
+                ocr_text = ocr_image_bytes(image_bytes, seen_images)
+                yield Chunk(
+                    "ocr",
+                    page_number + 1,
+                    f"\nOCR from Page {page_number + 1}:\n{ocr_text}\n",
+                )
+                continue
 
             # Extract images from the page
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = pdf_document.extract_image(xref)
-                image_bytes = base_image["image"]
-                image = Image.open(io.BytesIO(image_bytes))
+            for img_index, xref in plan:
+                with stage("image_decode"):
+                    image_bytes = pdf_document.extract_image(xref)["image"]
 
                 # Perform OCR on the image
-                ocr_text = pytesseract.image_to_string(image)
-                text += f"\nOCR from Image {img_index + 1} on Page {page_number + 1}:\n{ocr_text}\n"
-
+                ocr_text = ocr_image_bytes(image_bytes, seen_images)
+                yield Chunk(
+                    "ocr",
+                    page_number + 1,
+                    f"\nOCR from Image {img_index + 1} on Page {page_number + 1}:\n{ocr_text}\n",
+                )
+    finally:
         pdf_document.close()
+
+
+def _extract_pages(source, page_indexes, plans):
+    """
+    Extract the chunks of some pages of a PDF in a worker process, following
+    the plans made for them. Returns the chunks, their stage timings and
+    their OCR cache counters.
+    """
+    with collect() as breakdown, collect_counts() as counts:
+        chunks = list(_iter_pages(source, page_indexes, OcrPlanner(), plans))
+    return chunks, breakdown, counts
+
+
+def _page_ranges(page_count, page_workers):
+    """Split page_count pages into contiguous (start, stop) ranges."""
+    range_count = min(page_count, page_workers * RANGES_PER_WORKER)
+    range_size, remainder = divmod(page_count, range_count)
+    ranges = []
+    start = 0
+    for range_index in range(range_count):
+        stop = start + range_size + (1 if range_index < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def shutdown_page_executors():
+    """Shut down the process pools used for page-level parallelism."""
+    with _page_executors_lock:
+        executors = list(_page_executors.values())
+        _page_executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+def _get_page_executor(page_workers):
+    """Return the process pool used for page-level parallelism."""
+    with _page_executors_lock:
+        if not _page_executors:
+            # Runs at exit before multiprocessing joins child processes, also
+            # in the worker processes of the process and hybrid backends, and
+            # before the pools' queues are closed (priority 10), so their
+            # workers still get told to stop instead of being waited on forever
+            multiprocessing.util.Finalize(
+                None, shutdown_page_executors, exitpriority=100
+            )
+        if page_workers not in _page_executors:
+            _page_executors[page_workers] = ProcessPoolExecutor(
+                max_workers=page_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _page_executors[page_workers]
+
+
+def iter_text_and_images_from_pdf(source, page_workers=None, pages=None):
+    """
+    Yield text and OCR output of a PDF in page order.
+
+    With more than one page worker the pages are split into ranges that are
+    processed in parallel; each range is yielded as soon as it and every
+    range before it are done. Which images to OCR is decided for the whole
+    document first, so the output does not depend on the page workers.
+    ``pages`` limits extraction, and OCR, to some page ranges. Ranges that
+    have not started are cancelled when the caller stops iterating.
+    """
+    page_workers = page_workers or PDF_PAGE_WORKERS
+    planner = OcrPlanner()
+    temp_path = None
+    try:
+        with stage("open"), _open_pdf(source) as pdf_document:
+            page_indexes = selected_pages(pages, len(pdf_document))
+            parallel = page_workers > 1 and len(page_indexes) > 1
+            if parallel:
+                # Planned here in page order, so an image on several pages
+                # is OCR'd once whichever ranges it falls in
+                with stage("parse"):
+                    plans = {
+                        index: _plan_page(
+                            planner,
+                            pdf_document[index].get_text("text"),
+                            pdf_document[index].get_images(full=True),
+                        )
+                        for index in page_indexes
+                    }
+
+        if not parallel:
+            yield from _iter_pages(source, page_indexes, planner)
+        else:
+            # Workers open a path rather than each unpickling the content, so
+            # content not in a file is written to one temporary file
+            if is_path(source):
+                shared_source = str(source)
+            else:
+                with open_bytes(source) as data, tempfile.NamedTemporaryFile(
+                    suffix=".pdf", delete=False
+                ) as temp_file:
+                    temp_path = temp_file.name
+                    temp_file.write(data)
+                shared_source = temp_path
+            groups = [
+                page_indexes[start:stop]
+                for start, stop in _page_ranges(len(page_indexes), page_workers)
+            ]
+            group_plans = [{index: plans[index] for index in group} for group in groups]
+            executor = _get_page_executor(page_workers)
+            sources = [shared_source] * len(groups)
+            for chunks, breakdown, counts in executor.map(
+                _extract_pages, sources, groups, group_plans
+            ):
+                merge(breakdown)
+                merge_counts(counts)
+                yield from chunks
+        planner.report(source_name(source))
     except Exception as e:
         raise RuntimeError(f"Failed to extract text and images from PDF: {e}")
-    return text
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+
+def extract_text_and_images_from_pdf(source, page_workers=None, pages=None):
+    """Extract text and images with OCR from a PDF."""
+    return join_chunks(iter_text_and_images_from_pdf(source, page_workers, pages))
@@ -1,47 +1,79 @@
 from pptx import Presentation
-from PIL import Image
-import pytesseract
-import io
+from extractors.chunks import Chunk, join_chunks
+from extractors.limits import selected_pages
+from extractors.ocr import ocr_image_bytes
+from extractors.ocr_plan import OcrPlanner
+from extractors.source import open_stream, source_name
+from utils.metrics import stage
 
 
-def extract_text_from_pptx(file_path):
-    """Extract text from a PPTX file."""
+def iter_text_from_pptx(source, pages=None):
+    """
+    Yield the text of a PPTX one slide at a time.
+
+    ``source`` is a path, bytes-like content or a binary file object.
+    ``pages`` limits extraction to some slide ranges (see ExtractionLimits).
+    """
     try:
-        text = ""
-        prs = Presentation(file_path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text += shape.text + "\n"
-        return text
+        with stage("open"):
+            prs = Presentation(open_stream(source))
+        for index in selected_pages(pages, len(prs.slides)):
+            with stage("parse"):
+                slide, slide_number = prs.slides[index], index + 1
+                slide_text = "".join(
+                    shape.text + "\n" for shape in slide.shapes if shape.has_text_frame
+                )
+            yield Chunk("slide", slide_number, slide_text)
     except Exception as e:
         raise RuntimeError(f"Failed to extract text from PPTX: {e}")
 
 
-def extract_text_and_images_from_pptx(file_path):
-    """Extract text and perform OCR on images in a PPTX."""
-    text = ""
+def extract_text_from_pptx(source, pages=None):
+    """Extract text from a PPTX file."""
+    return join_chunks(iter_text_from_pptx(source, pages))
+
+
+def iter_text_and_images_from_pptx(source, pages=None):
+    """Yield the text and OCR output of a PPTX slide by slide."""
+    seen_images = {}
+    planner = OcrPlanner()
     try:
-        presentation = Presentation(file_path)
+        with stage("open"):
+            presentation = Presentation(open_stream(source))
 
-        for slide_number, slide in enumerate(presentation.slides, start=1):
-            text += f"Slide {slide_number}:\n"
+        for index in selected_pages(pages, len(presentation.slides)):
+            with stage("parse"):
+                slide, slide_number = presentation.slides[index], index + 1
+                # Extract text from shapes
+                slide_text = "".join(
+                    shape.text + "\n" for shape in slide.shapes if shape.has_text_frame
+                )
+                pictures = [shape for shape in slide.shapes if shape.shape_type == 13]
+            yield Chunk("slide", slide_number, f"Slide {slide_number}:\n{slide_text}")
 
-            # Extract text from shapes
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text += shape.text + "\n"
+            if planner.should_skip_page_images(slide_text, len(pictures)):
+                continue
 
             # Extract images from the slide
-            for shape in slide.shapes:
-                if shape.shape_type == 13:  # Shape with embedded image
+            for shape in pictures:
+                with stage("image_decode"):
                     image = shape.image
-                    image_stream = io.BytesIO(image.blob)
-                    pil_image = Image.open(image_stream)
+                    width, height = image.size
+                if not planner.should_ocr_image(image.sha1, width, height):
+                    continue
 
-                    # Perform OCR on the image
-                    ocr_text = pytesseract.image_to_string(pil_image)
-                    text += f"\nOCR from Image on Slide {slide_number}:\n{ocr_text}\n"
+                # Perform OCR on the image
+                ocr_text = ocr_image_bytes(image.blob, seen_images)
+                yield Chunk(
+                    "ocr",
+                    slide_number,
+                    f"\nOCR from Image on Slide {slide_number}:\n{ocr_text}\n",
+                )
+        planner.report(source_name(source))
     except Exception as e:
         raise RuntimeError(f"Failed to extract text and images from PPTX: {e}")
-    return text
+
+
+def extract_text_and_images_from_pptx(source, pages=None):
+    """Extract text and perform OCR on images in a PPTX."""
+    return join_chunks(iter_text_and_images_from_pptx(source, pages))
@@ -0,0 +1,228 @@
+"""
+Prepare images for OCR so tesseract spends its time on text, not pixels.
+
+Every image OCR'd, whether an image file, an embedded image or a rendered
+PDF page, goes through ``preprocess_image``, which in order:
+
+1. converts it to grayscale, flattening transparency onto white;
+2. crops its empty margins;
+3. downscales it to OCR_TARGET_DPI, and to at most OCR_MAX_PIXELS;
+4. optionally binarizes it with Otsu's threshold;
+5. deskews it by the angle that makes its text lines sharpest.
+
+Each step is one or a few PIL operations over the whole image, run in C;
+Python only handles 256-bin histograms and row profiles of a thumbnail.
+PIL is imported on first use, like the rest of the OCR stack.
+"""
+
+import math
+import os
+
+# Set to 0 to send images to OCR as they are
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "1") == "1"
+
+# Images with a higher resolution are downscaled to it
+OCR_TARGET_DPI = int(os.environ.get("OCR_TARGET_DPI", 300))
+
+# Images with more pixels are downscaled to it, e.g. photos without a DPI;
+# the default is about an A4 page at 300 DPI
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", 9_000_000))
+
+# Binarize with Otsu's threshold; tesseract otherwise binarizes itself
+OCR_BINARIZE = os.environ.get("OCR_BINARIZE", "0") == "1"
+
+# Crop margins without ink, keeping OCR_CROP_PADDING pixels around the text
+OCR_CROP_MARGINS = os.environ.get("OCR_CROP_MARGINS", "1") == "1"
+OCR_CROP_PADDING = int(os.environ.get("OCR_CROP_PADDING", 16))
+
+# Straighten text rotated by up to this many degrees; 0 disables deskewing
+OCR_DESKEW_MAX_ANGLE = float(os.environ.get("OCR_DESKEW_MAX_ANGLE", 5))
+
+# Gray levels darker than this count as ink when cropping and deskewing
+INK_LEVEL = 160
+
+# Longest side of the thumbnail deskew angles are scored on
+DESKEW_THUMBNAIL_SIZE = 512
+
+# Coarse step of the angle search in degrees; the best angle is then refined
+DESKEW_STEP = 1.0
+DESKEW_PRECISION = 0.25
+
+
+def preprocess_settings():
+    """Return the preprocessing settings, for use in cache keys."""
+    if not OCR_PREPROCESS:
+        return None
+    return (
+        OCR_TARGET_DPI,
+        OCR_MAX_PIXELS,
+        OCR_BINARIZE,
+        OCR_CROP_MARGINS,
+        OCR_CROP_PADDING,
+        OCR_DESKEW_MAX_ANGLE,
+    )
+
+
+def _scale(size, dpi, target_dpi, max_pixels):
+    """Return the factor an image is downscaled by, at most 1."""
+    scale = 1.0
+    if target_dpi and dpi and dpi[0] > target_dpi:
+        scale = target_dpi / dpi[0]
+    pixels = size[0] * size[1] * scale * scale
+    if max_pixels and pixels > max_pixels:
+        scale *= math.sqrt(max_pixels / pixels)
+    return scale
+
+
+def draft(
+    image, target_dpi=OCR_TARGET_DPI, max_pixels=OCR_MAX_PIXELS, enabled=OCR_PREPROCESS
+):
+    """
+    Let a JPEG that is not loaded yet decode straight to grayscale at about
+    the size preprocessing scales it to, skipping most of the decoding work.
+    """
+    if not enabled or image.format != "JPEG":
+        return
+    width, dpi = image.width, image.info.get("dpi")
+    scale = _scale(image.size, dpi, target_dpi, max_pixels)
+    image.draft("L", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+    if dpi and image.width != width:
+        # PIL keeps the resolution of the full-size image
+        image.info["dpi"] = tuple(value * image.width / width for value in dpi)
+
+
+def _grayscale(image):
+    from PIL import Image
+
+    if image.mode == "L":
+        return image
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        # Transparent areas would turn black
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image)
+    return image.convert("L")
+
+
+def otsu_threshold(histogram):
+    """Return the gray level that best separates ink from paper."""
+    total = sum(histogram)
+    level_sum = sum(level * count for level, count in enumerate(histogram))
+    best_level, best_variance = 0, -1.0
+    background_count = background_sum = 0
+    for level, count in enumerate(histogram):
+        background_count += count
+        background_sum += level * count
+        foreground_count = total - background_count
+        if not background_count or not foreground_count:
+            continue
+        background_mean = background_sum / background_count
+        foreground_mean = (level_sum - background_sum) / foreground_count
+        variance = (
+            background_count
+            * foreground_count
+            * (background_mean - foreground_mean) ** 2
+        )
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def _binarize(image):
+    threshold = otsu_threshold(image.histogram())
+    return image.point([0] * (threshold + 1) + [255] * (255 - threshold))
+
+
+def _ink(image):
+    """Return a mask of the dark pixels of a grayscale image, ink being 255."""
+    return image.point([255] * INK_LEVEL + [0] * (256 - INK_LEVEL))
+
+
+def _crop_margins(image, padding):
+    box = _ink(image).getbbox()
+    if box is None:
+        return image
+    left, top, right, bottom = box
+    box = (
+        max(0, left - padding),
+        max(0, top - padding),
+        min(image.width, right + padding),
+        min(image.height, bottom + padding),
+    )
+    return image if box == (0, 0, image.width, image.height) else image.crop(box)
+
+
+def _sharpness(ink, angle):
+    """Score how sharply the rows of ink rotated by angle separate into lines."""
+    from PIL import Image
+
+    rotated = ink.rotate(angle, Image.Resampling.BILINEAR, fillcolor=0)
+    # Averaging every row down to one pixel gives the row profile
+    profile = list(rotated.resize((1, rotated.height), Image.Resampling.BOX).getdata())
+    return sum((below - above) ** 2 for above, below in zip(profile, profile[1:]))
+
+
+def skew_angle(image, max_angle=OCR_DESKEW_MAX_ANGLE):
+    """
+    Return the angle in degrees that straightens the text lines of an image.
+
+    Angles are scored by the contrast between neighbouring rows of ink,
+    which peaks when text lines are horizontal: first every DESKEW_STEP up
+    to max_angle either way, then around the best one to DESKEW_PRECISION.
+    """
+    ink = _ink(image)
+    ink.thumbnail((DESKEW_THUMBNAIL_SIZE, DESKEW_THUMBNAIL_SIZE))
+    scores = {0.0: _sharpness(ink, 0.0)}
+
+    def search(center, radius, step):
+        steps = int(radius / step)
+        for index in range(-steps, steps + 1):
+            angle = round(center + index * step, 4)
+            if abs(angle) <= max_angle and angle not in scores:
+                scores[angle] = _sharpness(ink, angle)
+        return max(scores, key=scores.get)
+
+    best = search(0.0, max_angle, DESKEW_STEP)
+    best = search(best, DESKEW_STEP, DESKEW_PRECISION)
+    return best if scores[best] > scores[0.0] else 0.0
+
+
+def preprocess_image(
+    image,
+    target_dpi=OCR_TARGET_DPI,
+    max_pixels=OCR_MAX_PIXELS,
+    binarize=OCR_BINARIZE,
+    crop_margins=OCR_CROP_MARGINS,
+    deskew_max_angle=OCR_DESKEW_MAX_ANGLE,
+    enabled=OCR_PREPROCESS,
+):
+    """Return a PIL image prepared for OCR; see the module docstring."""
+    from PIL import Image
+
+    if not enabled:
+        return image
+
+    dpi = image.info.get("dpi")
+    image = _grayscale(image)
+    if crop_margins:
+        # Cropped first, so the blank part of a page is never resized; the
+        # padding is at least OCR_CROP_PADDING pixels once downscaled
+        scale = _scale(image.size, dpi, target_dpi, max_pixels)
+        image = _crop_margins(image, math.ceil(OCR_CROP_PADDING / scale))
+    scale = _scale(image.size, dpi, target_dpi, max_pixels)
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # Averaging the pixels each output pixel covers keeps strokes whole
+        image = image.resize(size, Image.Resampling.BOX)
+    if binarize:
+        image = _binarize(image)
+    if deskew_max_angle:
+        angle = skew_angle(image, deskew_max_angle)
+        if angle:
+            image = image.rotate(
+                angle, Image.Resampling.BILINEAR, expand=True, fillcolor=255
+            )
+    if dpi:
+        # Tells tesseract the size of the text
+        image.info["dpi"] = (dpi[0] * scale, dpi[1] * scale)
+    return image
@@ -0,0 +1,185 @@
+"""
+Registry of extractors keyed by file extension and MIME type.
+
+Extractors are registered by the dotted path of their chunk generators, so
+a parsing library is only imported the first time a file of its type is
+extracted. Third-party packages add extractors through the
+``text_extractor.extractors`` entry point group; each entry point is a
+callable that receives ``register`` and calls it for its formats.
+"""
+
+import importlib
+import logging
+import threading
+from importlib.metadata import entry_points
+from pathlib import Path
+
+logger = logging.getLogger("TextExtractor")
+
+ENTRY_POINT_GROUP = "text_extractor.extractors"
+
+
+class Extractor:
+    """
+    A registered extractor, imported on first use.
+
+    ``target`` and ``ocr_target`` are ``"module:function"`` paths of
+    generators that take a source and yield chunks; ``ocr_target`` is used
+    when OCR is enabled and defaults to ``target``. Extractors of paged
+    formats also take ``pages``, a tuple of page ranges to extract.
+    """
+
+    __slots__ = ("name", "extensions", "mime_types", "target", "ocr_target", "paged")
+
+    def __init__(
+        self,
+        name,
+        extensions,
+        target,
+        ocr_target=None,
+        mime_types=(),
+        paged=False,
+    ):
+        self.name = name
+        self.extensions = [extension.lower() for extension in extensions]
+        self.mime_types = list(mime_types)
+        self.target = target
+        self.ocr_target = ocr_target or target
+        self.paged = paged
+
+    def iter_chunks(self, source, enable_ocr=False, pages=None):
+        """Return an iterator of the chunks extracted from source."""
+        function = _load(self.ocr_target if enable_ocr else self.target)
+        if pages and self.paged:
+            return function(source, pages=pages)
+        return function(source)
+
+    def load(self):
+        """Import the extractor's functions now rather than on first use."""
+        _load(self.target)
+        _load(self.ocr_target)
+
+
+_by_extension = {}
+_by_mime_type = {}
+_functions = {}
+_lock = threading.Lock()
+_plugins_loaded = False
+
+
+def _load(target):
+    function = _functions.get(target)
+    if function is None:
+        module_name, _, attribute = target.partition(":")
+        function = getattr(importlib.import_module(module_name), attribute)
+        _functions[target] = function
+    return function
+
+
+def register(name, extensions, target, ocr_target=None, mime_types=(), paged=False):
+    """Register an extractor; later registrations override earlier ones."""
+    extractor = Extractor(name, extensions, target, ocr_target, mime_types, paged)
+    with _lock:
+        for extension in extractor.extensions:
+            _by_extension[extension] = extractor
+        for mime_type in extractor.mime_types:
+            _by_mime_type[mime_type] = extractor
+    return extractor
+
+
+def _load_plugins():
+    """Register the extractors of installed plugins, once."""
+    global _plugins_loaded
+    with _lock:
+        if _plugins_loaded:
+            return
+        _plugins_loaded = True
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            entry_point.load()(register)
+        except Exception as e:
+            logger.error(f"Failed to load extractor plugin {entry_point.name}: {e}")
+
+
+def get_extractor(filename=None, mime_type=None):
+    """
+    Return the extractor for a file name or path, or else its MIME type.
+
+    Returns None when neither is supported.
+    """
+    _load_plugins()
+    if filename is not None:
+        extractor = _by_extension.get(Path(filename).suffix.lower())
+        if extractor is not None:
+            return extractor
+    if mime_type is not None:
+        return _by_mime_type.get(mime_type.split(";")[0].strip().lower())
+    return None
+
+
+def resolve_filename(filename, mime_type=None):
+    """
+    Return a file name whose extension selects the right extractor.
+
+    Files named without a supported extension but sent with a supported
+    MIME type get that extractor's extension appended; anything else is
+    returned unchanged.
+    """
+    _load_plugins()
+    if Path(filename or "").suffix.lower() in _by_extension:
+        return filename
+    extractor = get_extractor(mime_type=mime_type)
+    if extractor is None:
+        return filename
+    return f"{filename or 'upload'}{extractor.extensions[0]}"
+
+
+def supported_extensions():
+    """Return every registered file extension."""
+    _load_plugins()
+    return list(_by_extension)
+
+
+def load_all():
+    """Import every registered extractor, e.g. to warm up a worker process."""
+    _load_plugins()
+    for extractor in set(_by_extension.values()):
+        extractor.load()
+
+
+register(
+    "pdf",
+    [".pdf"],
+    "extractors.pdf_extractor:iter_text_from_pdf",
+    "extractors.pdf_extractor:iter_text_and_images_from_pdf",
+    ["application/pdf"],
+    paged=True,
+)
+register(
+    "pptx",
+    [".pptx"],
+    "extractors.pptx_extractor:iter_text_from_pptx",
+    "extractors.pptx_extractor:iter_text_and_images_from_pptx",
+    ["application/vnd.openxmlformats-officedocument.presentationml.presentation"],
+    paged=True,
+)
+register(
+    "image",
+    [".png", ".jpg", ".jpeg"],
+    "extractors.image_extractor:iter_text_from_image",
+    mime_types=["image/png", "image/jpeg"],
+)
+register(
+    "txt",
+    [".txt", ".log", ".csv", ".json"],
+    "extractors.txt_extractor:iter_text_from_txt",
+    mime_types=["text/plain", "text/csv", "application/json"],
+)
+register(
+    "docx",
+    [".docx"],
+    "extractors.docx_extractor:iter_text_from_docx",
+    "extractors.docx_extractor:iter_text_and_images_from_docx",
+    ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"],
+)
@@ -0,0 +1,176 @@
+import json
+import time
+from array import array
+from extractors.chunks import Chunk
+
+# Bumped whenever the serialized layout changes, so cached results stay readable
+RESULT_FORMAT = 2
+
+
+class ExtractionResult:
+    """
+    Extracted text with the span of every page, slide, paragraph and OCR'd image.
+
+    The text is held once and spans are parallel arrays of character
+    offsets into it, so callers can slice out a page range without
+    re-parsing the "Page N:" markers. ``ocr`` records the OCR engine when any
+    span came from OCR, ``timings`` the seconds spent producing each kind of
+    span, and ``truncated`` which limit, if any, cut the text short.
+
+    ``breakdown`` holds the seconds spent in each extraction stage (see
+    utils.metrics). It is None for results read back from the cache and is
+    only serialized when asked for. ``counts`` holds the OCR plan and cache
+    counters of the extraction, which are never serialized.
+    """
+
+    __slots__ = (
+        "text",
+        "kind_names",
+        "kinds",
+        "numbers",
+        "starts",
+        "ends",
+        "ocr",
+        "timings",
+        "truncated",
+        "breakdown",
+        "counts",
+    )
+
+    def __init__(
+        self,
+        text="",
+        kind_names=(),
+        kinds=(),
+        numbers=(),
+        starts=(),
+        ends=(),
+        ocr=None,
+        timings=None,
+        truncated=None,
+        breakdown=None,
+        counts=None,
+    ):
+        self.text = text
+        self.kind_names = list(kind_names)
+        self.kinds = array("B", kinds)
+        self.numbers = array("I", numbers)
+        self.starts = array("Q", starts)
+        self.ends = array("Q", ends)
+        self.ocr = ocr
+        self.timings = timings or {}
+        self.truncated = truncated
+        self.breakdown = breakdown
+        self.counts = counts
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Consume a chunk iterator, timing how long each kind of chunk took."""
+        result = cls()
+        kind_indexes = {}
+        parts = []
+        offset = 0
+        started = last = time.perf_counter()
+        for chunk in chunks:
+            now = time.perf_counter()
+            result.timings[chunk.kind] = result.timings.get(chunk.kind, 0.0) + (
+                now - last
+            )
+
+            kind_index = kind_indexes.get(chunk.kind)
+            if kind_index is None:
+                kind_index = kind_indexes[chunk.kind] = len(result.kind_names)
+                result.kind_names.append(chunk.kind)
+            result.kinds.append(kind_index)
+            result.numbers.append(chunk.number)
+            result.starts.append(offset)
+            offset += len(chunk.text)
+            result.ends.append(offset)
+            parts.append(chunk.text)
+            last = time.perf_counter()
+
+        result.text = "".join(parts)
+        result.timings["total"] = time.perf_counter() - started
+        return result
+
+    def __len__(self):
+        return len(self.starts)
+
+    def spans(self):
+        """Yield ``(kind, number, start, end)`` for every span."""
+        for kind, number, start, end in zip(
+            self.kinds, self.numbers, self.starts, self.ends
+        ):
+            yield self.kind_names[kind], number, start, end
+
+    def chunks(self):
+        """Yield the spans as chunks, as the extractor originally produced them."""
+        for kind, number, start, end in self.spans():
+            yield Chunk(kind, number, self.text[start:end])
+
+    def has_kind(self, kind):
+        """Return True if any span is of the given kind."""
+        return kind in self.kind_names
+
+    def page_range(self, first, last=None):
+        """
+        Return the text of the spans numbered first to last, inclusive.
+
+        Pages, slides and paragraphs are numbered from 1, and OCR spans
+        carry the number of the page they belong to. Spans are stored in
+        order, so the range is one slice of the text.
+        """
+        last = first if last is None else last
+        start = end = None
+        for number, span_start, span_end in zip(self.numbers, self.starts, self.ends):
+            if first <= number <= last:
+                if start is None:
+                    start = span_start
+                end = span_end
+        return "" if start is None else self.text[start:end]
+
+    def to_dict(self):
+        """Return a JSON-ready dict with the spans laid out column by column."""
+        return {
+            "extracted_text": self.text,
+            "spans": {
+                "kind": [self.kind_names[kind] for kind in self.kinds],
+                "number": self.numbers.tolist(),
+                "start": self.starts.tolist(),
+                "end": self.ends.tolist(),
+            },
+            "ocr": self.ocr,
+            "timings": self.timings,
+            "truncated": self.truncated,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        spans = data["spans"]
+        kind_names = list(dict.fromkeys(spans["kind"]))
+        kind_indexes = {kind: index for index, kind in enumerate(kind_names)}
+        return cls(
+            data["extracted_text"],
+            kind_names,
+            [kind_indexes[kind] for kind in spans["kind"]],
+            spans["number"],
+            spans["start"],
+            spans["end"],
+            data.get("ocr"),
+            data.get("timings"),
+            data.get("truncated"),
+        )
+
+    def to_json(self, **fields):
+        """Serialize to JSON, with any extra top-level fields first."""
+        return json.dumps({**fields, **self.to_dict()}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls.from_dict(json.loads(data))
+
+    def to_msgpack(self, **fields):
+        """Serialize to msgpack; requires the optional msgpack package."""
+        import msgpack
+
+        return msgpack.packb({**fields, **self.to_dict()})
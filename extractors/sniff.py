@@ -0,0 +1,317 @@
+"""
+Tell what a document is from its content, and describe it cheaply.
+
+The type of a document is told from its first SNIFF_BYTES: the magic
+number of a PDF or image, the names of the first zip entries of a PPTX or
+DOCX (or the zip's central directory when those do not tell) and, failing
+those, whether the bytes decode as text. ``inspect_source`` adds what the
+container alone says: the page or slide count, the image count and whether
+there is a text layer. Neither parses any page, slide or paragraph.
+"""
+
+import codecs
+import logging
+import os
+import re
+import zipfile
+from typing import NamedTuple
+from extractors.registry import get_extractor
+from extractors.source import (
+    BYTES_TYPES,
+    is_path,
+    open_stream,
+    source_path,
+    source_size,
+)
+from extractors.txt_extractor import sniff_encoding
+from utils.file_utils import get_file_extension
+
+logger = logging.getLogger("TextExtractor")
+
+# Leading bytes read to tell the type of a document
+SNIFF_BYTES = int(os.environ.get("SNIFF_BYTES", 8 * 1024))
+
+PDF_MIME_TYPE = "application/pdf"
+PPTX_MIME_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+)
+DOCX_MIME_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+ZIP_MIME_TYPE = "application/zip"
+TEXT_MIME_TYPE = "text/plain"
+
+IMAGE_MAGIC_NUMBERS = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+]
+ZIP_MAGIC_NUMBER = b"PK\x03\x04"
+
+# Folder of the main part of each zip-based format
+ZIP_FOLDERS = {"ppt/": PPTX_MIME_TYPE, "word/": DOCX_MIME_TYPE}
+
+# Types the content always tells, so a file named as one of them that is
+# not one is mislabelled
+SNIFFED_MIME_TYPES = {PDF_MIME_TYPE, PPTX_MIME_TYPE, DOCX_MIME_TYPE} | {
+    mime_type for _, mime_type in IMAGE_MAGIC_NUMBERS
+}
+
+# Text runs holding at least one character
+PPTX_TEXT = re.compile(rb"<a:t>[^<]")
+DOCX_TEXT = re.compile(rb"<w:t(?: [^>]*)?>[^<]")
+DOCX_PAGES = re.compile(rb"<Pages>(\d+)</Pages>")
+
+# Bytes of a zip entry searched at a time for text
+SEARCH_BLOCK_BYTES = 64 * 1024
+
+
+class DocumentInfo(NamedTuple):
+    """What the container of a document says about it; None when unknown."""
+
+    mime_type: str | None
+    extractor: str | None
+    matches_name: bool
+    size: int | None
+    pages: int | None = None
+    images: int | None = None
+    has_text: bool | None = None
+
+
+def _read_prefix(source):
+    if isinstance(source, BYTES_TYPES):
+        return bytes(memoryview(source)[:SNIFF_BYTES])
+    if is_path(source):
+        with open(source, "rb") as file:
+            return file.read(SNIFF_BYTES)
+    source.seek(0)
+    try:
+        return source.read(SNIFF_BYTES)
+    finally:
+        source.seek(0)
+
+
+def _zip_entry_names(prefix):
+    """Yield the names of the zip entries whose local headers are in prefix."""
+    offset = prefix.find(ZIP_MAGIC_NUMBER)
+    while offset != -1 and offset + 30 <= len(prefix):
+        name_length = int.from_bytes(prefix[offset + 26 : offset + 28], "little")
+        yield prefix[offset + 30 : offset + 30 + name_length].decode("utf-8", "replace")
+        offset = prefix.find(ZIP_MAGIC_NUMBER, offset + 30)
+
+
+def _zip_mime_type(names):
+    for name in names:
+        for folder, mime_type in ZIP_FOLDERS.items():
+            if name.startswith(folder):
+                return mime_type
+    return None
+
+
+def _looks_like_text(prefix):
+    """Return True if prefix decodes without control characters."""
+    try:
+        text = codecs.getincrementaldecoder(sniff_encoding(prefix))().decode(
+            prefix, final=False
+        )
+    except UnicodeDecodeError:
+        return False
+    controls = sum(1 for char in text if char < " " and char not in "\t\n\v\f\r\x1b")
+    # A stray control character does not make a log file binary
+    return bool(text) and controls * 100 <= len(text)
+
+
+def sniff_prefix(prefix):
+    """
+    Return the MIME type told by the first bytes of a document, or None.
+
+    Zip files whose first entries do not tell their format are
+    ``application/zip``.
+    """
+    prefix = bytes(prefix)
+    # Only whitespace or a byte order mark may come before a PDF header, so
+    # text that merely mentions one is not taken for a PDF
+    if prefix.removeprefix(codecs.BOM_UTF8).lstrip().startswith(b"%PDF-"):
+        return PDF_MIME_TYPE
+    for magic_number, mime_type in IMAGE_MAGIC_NUMBERS:
+        if prefix.startswith(magic_number):
+            return mime_type
+    if prefix.startswith(ZIP_MAGIC_NUMBER):
+        return _zip_mime_type(_zip_entry_names(prefix)) or ZIP_MIME_TYPE
+    if _looks_like_text(prefix):
+        return TEXT_MIME_TYPE
+    return None
+
+
+def sniff_mime_type(source, prefix=None):
+    """
+    Return the MIME type told by the content of a source, or None.
+
+    Reads SNIFF_BYTES, unless the caller passes them as ``prefix``, plus the
+    central directory of zip files whose first entries do not tell their
+    format.
+    """
+    if prefix is None:
+        prefix = _read_prefix(source)
+    mime_type = sniff_prefix(prefix)
+    if mime_type != ZIP_MIME_TYPE:
+        return mime_type
+    try:
+        with zipfile.ZipFile(open_stream(source)) as archive:
+            return _zip_mime_type(archive.namelist()) or ZIP_MIME_TYPE
+    except zipfile.BadZipFile:
+        return ZIP_MIME_TYPE
+    finally:
+        if not is_path(source) and not isinstance(source, BYTES_TYPES):
+            source.seek(0)
+
+
+def _choose_extractor(named, mime_type, name, prefix):
+    """Pick between the extractor a source is named for and the sniffed type."""
+    if (
+        named is not None
+        and TEXT_MIME_TYPE in named.mime_types
+        and _looks_like_text(prefix)
+    ):
+        # A text file is only read as something else when it is not text
+        return named
+    sniffed = get_extractor(mime_type=mime_type) if mime_type else None
+    # Text is only a guess, and may be a plugin's text format
+    if sniffed is not None and (named is None or mime_type != TEXT_MIME_TYPE):
+        if named is not None and sniffed is not named:
+            logger.info(f"{name} is {mime_type}; extracting it as {sniffed.name}")
+        return sniffed
+    if named is not None and SNIFFED_MIME_TYPES.intersection(named.mime_types):
+        raise ValueError(
+            f"File content does not match its type: {get_file_extension(name)}"
+        )
+    return named
+
+
+def detect_extractor(source, filename=None):
+    """
+    Return the extractor for a source, checking its name against its content.
+
+    A binary type told by the content wins over the extension, so a PDF
+    saved as ``.docx`` is read as a PDF, while sniffed text never overrides
+    an extension and a file named as text that decodes as text stays text.
+    Returns None when neither the name nor the content is supported, and
+    raises ValueError for a file named as a PDF, PPTX, DOCX or image that
+    is not one.
+    """
+    named = get_extractor(filename or source)
+    prefix = _read_prefix(source)
+    mime_type = sniff_mime_type(source, prefix)
+    return _choose_extractor(named, mime_type, filename or source, prefix)
+
+
+def _open_pdf(source):
+    import fitz
+
+    path = source_path(source)
+    if path is not None:
+        return fitz.open(path)
+    stream = open_stream(source)
+    return fitz.open(
+        stream=stream if isinstance(stream, BYTES_TYPES) else stream.read(),
+        filetype="pdf",
+    )
+
+
+def _inspect_pdf(source, count_images, text_layer):
+    images = has_text = None
+    with _open_pdf(source) as document:
+        pages = document.page_count
+        if count_images:
+            images = sum(len(document.get_page_images(index)) for index in range(pages))
+        if text_layer:
+            # Text is drawn with fonts, so a page without any has no text layer
+            has_text = any(document.get_page_fonts(index) for index in range(pages))
+    return pages, images, has_text
+
+
+def _search_entries(archive, names, pattern):
+    """Return True if pattern occurs in a zip entry, reading them block by block."""
+    for name in names:
+        tail = b""
+        with archive.open(name) as entry:
+            while block := entry.read(SEARCH_BLOCK_BYTES):
+                if pattern.search(tail + block):
+                    return True
+                tail = block[-256:]
+    return False
+
+
+def _inspect_pptx(source, text_layer):
+    with zipfile.ZipFile(open_stream(source)) as archive:
+        names = archive.namelist()
+        slides = [
+            name
+            for name in names
+            if name.startswith("ppt/slides/slide") and name.endswith(".xml")
+        ]
+        images = sum(1 for name in names if "/media/" in name)
+        has_text = _search_entries(archive, slides, PPTX_TEXT) if text_layer else None
+    return len(slides), images, has_text
+
+
+def _inspect_docx(source, text_layer):
+    with zipfile.ZipFile(open_stream(source)) as archive:
+        names = archive.namelist()
+        pages = None
+        if "docProps/app.xml" in names:
+            # Word saves the page count of its last layout
+            found = DOCX_PAGES.search(archive.read("docProps/app.xml"))
+            pages = int(found.group(1)) if found else None
+        images = sum(1 for name in names if "/media/" in name)
+        has_text = (
+            _search_entries(archive, {"word/document.xml"} & set(names), DOCX_TEXT)
+            if text_layer
+            else None
+        )
+    return pages, images, has_text
+
+
+def inspect_source(source, filename=None, count_images=True, text_layer=True):
+    """
+    Describe a source from its content type and container, without parsing it.
+
+    ``pages`` counts PDF pages, PPTX slides, and DOCX pages as of the last
+    time Word saved the file. ``has_text`` tells whether text can be
+    extracted without OCR. Set ``count_images`` or ``text_layer`` to False
+    to skip the work those take. Raises RuntimeError for a container that
+    cannot be read.
+    """
+    name = filename or source
+    named = get_extractor(name)
+    prefix = _read_prefix(source)
+    mime_type = sniff_mime_type(source, prefix)
+    try:
+        extractor = _choose_extractor(named, mime_type, name, prefix)
+    except ValueError:
+        extractor = None
+    info = DocumentInfo(
+        mime_type,
+        extractor.name if extractor else None,
+        named is None or extractor is named,
+        source_size(source),
+    )
+
+    try:
+        if info.extractor == "pdf":
+            pages, images, has_text = _inspect_pdf(source, count_images, text_layer)
+        elif info.extractor == "pptx":
+            pages, images, has_text = _inspect_pptx(source, text_layer)
+        elif info.extractor == "docx":
+            pages, images, has_text = _inspect_docx(source, text_layer)
+        elif info.extractor == "image":
+            pages, images, has_text = None, 1, False
+        elif info.extractor == "txt":
+            pages, images, has_text = None, 0, info.size != 0
+        else:
+            return info
+    except Exception as e:
+        raise RuntimeError(f"Failed to inspect {get_file_extension(name)} file: {e}")
+    finally:
+        if not is_path(source) and not isinstance(source, BYTES_TYPES):
+            source.seek(0)
+    return info._replace(pages=pages, images=images, has_text=has_text)
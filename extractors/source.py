@@ -0,0 +1,125 @@
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from utils.cache import HASH_CHUNK_SIZE, hash_bytes, hash_file
+
+# Local files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD_BYTES = int(os.environ.get("MMAP_THRESHOLD_BYTES", 8 * 1024 * 1024))
+
+# In-memory document content; binary file objects are accepted as well
+BYTES_TYPES = (bytes, bytearray, memoryview)
+
+
+def is_path(source):
+    """Return True if a source is a filesystem path rather than content."""
+    return isinstance(source, (str, os.PathLike))
+
+
+def source_name(source):
+    """Return a printable name for a source, for logs and error messages."""
+    if is_path(source):
+        return str(source)
+    if isinstance(source, BYTES_TYPES):
+        return f"<{memoryview(source).nbytes} bytes>"
+    return str(getattr(source, "name", "<stream>"))
+
+
+def source_path(source):
+    """
+    Return a path the content of a source can be opened from, or None.
+
+    Paths are returned as they are. File objects backed by a file on disk,
+    such as uploads the multipart parser spooled to disk, get that file's
+    path, or its ``/proc/self/fd`` link when the file has no name, so
+    readers can open them without copying the content into memory.
+    """
+    if is_path(source):
+        return source
+    if isinstance(source, BYTES_TYPES):
+        return None
+    # A spooled file still in memory has no name, and asking for its
+    # fileno() would write it to disk
+    name = getattr(source, "name", None)
+    if isinstance(name, int):
+        name = f"/proc/self/fd/{name}"
+    if not isinstance(name, str) or not os.path.isfile(name):
+        return None
+    # Buffered writes must reach the file before it is opened again
+    source.flush()
+    return name
+
+
+def source_size(source):
+    """Return the size of a source in bytes, or None if it is unknown."""
+    try:
+        if is_path(source):
+            return os.path.getsize(source)
+        if isinstance(source, BYTES_TYPES):
+            return memoryview(source).nbytes
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+@contextmanager
+def open_bytes(source):
+    """
+    Yield the whole content of a source as a bytes-like object.
+
+    Bytes-like sources are yielded as they are and large local files are
+    memory-mapped, so neither is copied.
+    """
+    if isinstance(source, BYTES_TYPES):
+        yield source
+    elif is_path(source):
+        with open(source, "rb") as file:
+            if os.fstat(file.fileno()).st_size < MMAP_THRESHOLD_BYTES:
+                yield file.read()
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped
+    else:
+        # Files already on disk, such as spooled uploads, are mapped as well
+        try:
+            fileno = source.fileno()
+            large = os.fstat(fileno).st_size >= MMAP_THRESHOLD_BYTES
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            large = False
+        if large:
+            with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+        else:
+            source.seek(0)
+            yield source.read()
+
+
+def open_stream(source):
+    """
+    Return a source in a form zip-based readers accept.
+
+    Paths are returned unchanged so the reader opens the file itself; other
+    sources become a binary file object positioned at the start.
+    """
+    if is_path(source):
+        return source
+    if isinstance(source, BYTES_TYPES):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def hash_source(source):
+    """Return the SHA-256 hex digest of a source's content."""
+    if is_path(source):
+        return hash_file(source)
+    if isinstance(source, BYTES_TYPES):
+        return hash_bytes(source)
+
+    source.seek(0)
+    digest = hashlib.sha256()
+    while chunk := source.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
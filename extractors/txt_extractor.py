@@ -1,9 +1,135 @@
-def extract_text_from_txt(file_path):
-    """Extract text from a TXT."""
-    text = ""
+import codecs
+import io
+import logging
+import os
+from extractors.chunks import Chunk, join_chunks
+from extractors.source import BYTES_TYPES, is_path, source_name
+from utils.metrics import stage
+
+logger = logging.getLogger("TextExtractor")
+
+# Bytes decoded at a time, so memory stays flat however large the file is
+TXT_CHUNK_BYTES = int(os.environ.get("TXT_CHUNK_BYTES", 1024 * 1024))
+
+# Bytes looked at to guess the encoding of a file without a byte order mark
+TXT_SNIFF_BYTES = int(os.environ.get("TXT_SNIFF_BYTES", 64 * 1024))
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def sniff_encoding(prefix):
+    """
+    Guess the encoding of text from its first bytes.
+
+    A byte order mark wins; otherwise UTF-16 without a BOM is recognised by
+    its zero bytes, valid UTF-8 is UTF-8, and anything else is read as
+    cp1252, or latin-1 for the few bytes cp1252 leaves undefined.
+    """
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    # ASCII text in UTF-16 has a zero byte in every other position
+    if len(prefix) >= 2 and prefix.count(0) >= len(prefix) // 4:
+        even_zeros = prefix[0::2].count(0)
+        odd_zeros = prefix[1::2].count(0)
+        if odd_zeros > even_zeros * 4:
+            return "utf-16-le"
+        if even_zeros > odd_zeros * 4:
+            return "utf-16-be"
+
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            # The prefix may end in the middle of a character
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def _iter_blocks(source):
+    """Yield the content of a source in blocks of TXT_CHUNK_BYTES."""
+    if isinstance(source, BYTES_TYPES):
+        view = memoryview(source)
+        for start in range(0, len(view), TXT_CHUNK_BYTES):
+            yield view[start : start + TXT_CHUNK_BYTES]
+        return
+
+    if is_path(source):
+        file = open(source, "rb")
+    else:
+        file = source
+        file.seek(0)
+    try:
+        while block := file.read(TXT_CHUNK_BYTES):
+            yield block
+    finally:
+        if file is not source:
+            file.close()
+
+
+def _decoder(prefix, name):
+    """Return a decoder for the sniffed encoding that also normalises newlines."""
+    encoding = sniff_encoding(prefix[:TXT_SNIFF_BYTES])
+    if encoding not in ("utf-8", "utf-8-sig"):
+        logger.info(f"Reading {name} as {encoding}")
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    return io.IncrementalNewlineDecoder(decoder, translate=True)
+
+
+def iter_text_from_txt(source):
+    """
+    Yield the text of a TXT, log, CSV or JSON file in blocks of whole lines.
+
+    ``source`` is a path, bytes-like content or a binary file object. The
+    encoding is sniffed from the start of the file and the content decoded
+    incrementally, so only one block is held in memory at a time. Line
+    endings are normalised to ``\\n``; undecodable bytes become U+FFFD.
+    """
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            text = file.read()
+        blocks = _iter_blocks(source)
+        decoder = None
+        pending = ""
+        block_number = 0
+        prefix = b""
+        for block in blocks:
+            with stage("parse"):
+                if decoder is None:
+                    # Sniff from a full prefix even with small blocks
+                    prefix += bytes(block)
+                    if len(prefix) < TXT_SNIFF_BYTES:
+                        continue
+                    block = prefix
+                    decoder = _decoder(prefix, source_name(source))
+                text = pending + decoder.decode(block)
+                # Keep a partial last line for the next block, unless a single
+                # line grew past a block
+                cut = text.rfind("\n") + 1
+                if not cut and len(text) >= TXT_CHUNK_BYTES:
+                    cut = len(text)
+                text, pending = text[:cut], text[cut:]
+            if text:
+                block_number += 1
+                yield Chunk("text", block_number, text)
+
+        with stage("parse"):
+            if decoder is None:
+                decoder = _decoder(prefix, source_name(source))
+                pending += decoder.decode(prefix)
+            text = pending + decoder.decode(b"", final=True)
+        if text or not block_number:
+            yield Chunk("text", block_number + 1, text)
     except Exception as e:
-        print(f"Error reading TXT: {e}")
-    return text
+        raise RuntimeError(f"Failed to extract text from TXT: {e}")
+
+
+def extract_text_from_txt(source):
+    """Extract text from a TXT."""
+    return join_chunks(iter_text_from_txt(source))
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from utils.metrics import collecting_counts, count, register_counts
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of a bytes-like object."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(*parts):
+    """Build a cache key from a content hash and the options it depends on."""
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class TieredCache:
+    """
+    Text cache with an in-memory LRU tier in front of an on-disk tier.
+
+    Both tiers are bounded by size in bytes. The disk tier is a directory of
+    one file per key, so it can be shared between worker processes; its
+    entries are evicted oldest-used first.
+
+    A cache with a ``name`` counts the hits and misses of extractions
+    collecting counts (see utils.metrics) with them, so the API process
+    serves the counters of lookups made in worker processes.
+    """
+
+    HIT_COUNTERS = ("hits", "memory_hits", "disk_hits", "misses")
+
+    def __init__(self, directory=None, max_memory_bytes=0, max_disk_bytes=0, name=None):
+        self.directory = Path(directory) if directory else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self.name = name
+        if self.directory and self.max_disk_bytes:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        if name:
+            register_counts(name, self.add_counts)
+
+    def get(self, key):
+        """Return the cached text for key, or None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+        if value is not None:
+            self._count("hits", "memory_hits")
+            return value
+
+        value = self._read_disk(key)
+        if value is None:
+            self._count("misses")
+            return None
+        with self._lock:
+            self._set_memory(key, value)
+        self._count("hits", "disk_hits")
+        return value
+
+    def _count(self, *names):
+        if self.name and collecting_counts():
+            # Served by the process that collects the extraction's counts
+            for name in names:
+                count(self.name, name)
+            return
+        with self._lock:
+            for name in names:
+                setattr(self, name, getattr(self, name) + 1)
+
+    def add_counts(self, counters):
+        """Add hit and miss counters collected in another process."""
+        with self._lock:
+            for name in self.HIT_COUNTERS:
+                setattr(self, name, getattr(self, name) + counters.get(name, 0))
+
+    def set(self, key, value):
+        """Store text under key in both tiers."""
+        with self._lock:
+            self._set_memory(key, value)
+        self._write_disk(key, value)
+
+    def stats(self):
+        """Return hit, miss and eviction counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def _set_memory(self, key, value):
+        size = len(value)
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = value
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.memory_evictions += 1
+
+    def _disk_path(self, key):
+        return self.directory / key[:2] / key
+
+    def _read_disk(self, key):
+        if not self.directory or not self.max_disk_bytes:
+            return None
+        path = self._disk_path(key)
+        try:
+            value = path.read_text(encoding="utf-8")
+            # Refresh the modification time so eviction is least-recently-used
+            os.utime(path)
+            return value
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.directory or not self.max_disk_bytes:
+            return
+        data = value.encode("utf-8")
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temp file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _disk_entries(self):
+        # Other processes write to the same directory, so entries may vanish
+        entries = []
+        for path in self.directory.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_disk(self):
+        # Rescan first, since other processes share the directory
+        entries = sorted(self._disk_entries())
+
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so every write near the limit does not rescan
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                self.disk_evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
@@ -1,8 +1,46 @@
+import functools
+import os
+import zipfile
+from io import BytesIO
+from lxml import etree
 from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE, MSO_SHAPE_TYPE
 from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.text.text import _Paragraph
 from pptx.util import Inches, Pt
 
+# Size up to which /generate-pptx/ keeps a generated deck in memory
+PPTX_SPOOL_BYTES = int(os.environ.get("PPTX_SPOOL_BYTES", 16 * 1024 * 1024))
+
+PPTX_MEDIA_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+)
+
+# Stand-ins for the card text and font size in the template slides
+TEMPLATE_TEXT = "{{flashcard}}"
+TEMPLATE_FONT_SIZE = "{{font_size}}"
+
+SLIDE_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+)
+SLIDE_RELATIONSHIP = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+)
+CONTENT_TYPES = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def font_size_for(text):
+    """Heuristic: reduce the font size of long text so it does not overflow."""
+    text_length = len(text)
+    if text_length > 200:
+        return Pt(24)
+    elif text_length > 100:
+        return Pt(28)
+    return Pt(36)
+
 
 def style_advanced(slide, text, is_front=True):
     """
@@ -81,16 +119,7 @@ def style_advanced(slide, text, is_front=True):
     p.text = text
 
     # --- Dynamic Font Sizing ---
-    # Heuristic: reduce font size based on text length
-    base_font_size = 36
-    text_length = len(text)
-    # Example heuristic: if text is very long, reduce font size
-    if text_length > 200:
-        font_size = Pt(24)
-    elif text_length > 100:
-        font_size = Pt(28)
-    else:
-        font_size = Pt(base_font_size)
+    font_size = font_size_for(text)
 
     # Customize text styling
     p.font.name = "Calibri"
@@ -108,25 +137,171 @@ styles = {
 }
 
 
+class SlideTemplate:
+    """
+    A styled slide serialized once, with holes for the card text and font size.
+
+    ``render`` fills the holes with plain string joins, so a card costs a few
+    microseconds instead of rebuilding the background, overlay and shapes.
+    """
+
+    def __init__(self, slide_xml, rels_xml):
+        root = parse_xml(slide_xml)
+        texts = [t for t in root.iter(qn("a:t")) if t.text == TEMPLATE_TEXT]
+        if len(texts) != 1:
+            raise ValueError("Style must place the flashcard text in one run")
+        run = texts[0].getparent()
+        paragraph = run.getparent()
+        paragraph.get_or_add_pPr().get_or_add_defRPr().set("sz", TEMPLATE_FONT_SIZE)
+        paragraph.replace(run, etree.Element("flashcard"))
+
+        xml = etree.tostring(
+            root, xml_declaration=True, encoding="UTF-8", standalone=True
+        ).decode("utf-8")
+        self.head, rest = xml.split(f'sz="{TEMPLATE_FONT_SIZE}"')
+        self.middle, self.tail = rest.split("<flashcard/>")
+        self.rels_xml = rels_xml
+
+    def render(self, text, scratch):
+        """Return the slide XML for text; ``scratch`` is a reusable paragraph."""
+        scratch.text = text
+        runs = etree.tostring(scratch._p, encoding="unicode")
+        # Keep what is inside <a:p ...>...</a:p>, the runs and line breaks
+        runs = runs[runs.index(">") + 1 : -len("</a:p>")] if len(scratch._p) else ""
+        font_size = int(font_size_for(text).pt * 100)
+        return "".join(
+            [self.head, f'sz="{font_size}"', self.middle, runs, self.tail]
+        ).encode("utf-8")
+
+
+class DeckTemplate:
+    """
+    The package of a flashcard deck and its styled front and back slides.
+
+    Built once per style by running the style function on two template
+    slides, so style assets such as the overlay image are read and added to
+    the package a single time.
+    """
+
+    def __init__(self, style_function):
+        presentation = Presentation()
+        layout = presentation.slide_layouts[6]  # Blank layout
+        for is_front in (True, False):
+            slide = presentation.slides.add_slide(layout)
+            style_function(slide, TEMPLATE_TEXT, is_front=is_front)
+
+        buffer = BytesIO()
+        presentation.save(buffer)
+        with zipfile.ZipFile(buffer) as archive:
+            self.front, self.back = [
+                SlideTemplate(
+                    archive.read(f"ppt/slides/slide{number}.xml"),
+                    archive.read(f"ppt/slides/_rels/slide{number}.xml.rels"),
+                )
+                for number in (1, 2)
+            ]
+            self.parts = {
+                name: archive.read(name)
+                for name in archive.namelist()
+                if not name.startswith("ppt/slides/")
+            }
+
+    def content_types(self, slide_count):
+        """Return [Content_Types].xml listing slide_count slides."""
+        root = etree.fromstring(self.parts["[Content_Types].xml"])
+        for override in root.findall(CONTENT_TYPES + "Override"):
+            if override.get("ContentType") == SLIDE_CONTENT_TYPE:
+                root.remove(override)
+        for number in range(1, slide_count + 1):
+            etree.SubElement(
+                root,
+                CONTENT_TYPES + "Override",
+                PartName=f"/ppt/slides/slide{number}.xml",
+                ContentType=SLIDE_CONTENT_TYPE,
+            )
+        return etree.tostring(
+            root, xml_declaration=True, encoding="UTF-8", standalone=True
+        )
+
+    def presentation(self, slide_count):
+        """Return presentation.xml and its relationships for slide_count slides."""
+        rels = etree.fromstring(self.parts["ppt/_rels/presentation.xml.rels"])
+        for relationship in rels.findall(RELS + "Relationship"):
+            if relationship.get("Type") == SLIDE_RELATIONSHIP:
+                rels.remove(relationship)
+        root = etree.fromstring(self.parts["ppt/presentation.xml"])
+        slide_list = root.find(qn("p:sldIdLst"))
+        for slide_id in list(slide_list):
+            slide_list.remove(slide_id)
+        for number in range(1, slide_count + 1):
+            etree.SubElement(
+                rels,
+                RELS + "Relationship",
+                Id=f"rIdSlide{number}",
+                Type=SLIDE_RELATIONSHIP,
+                Target=f"slides/slide{number}.xml",
+            )
+            slide_id = etree.SubElement(slide_list, qn("p:sldId"))
+            slide_id.set("id", str(255 + number))
+            slide_id.set(qn("r:id"), f"rIdSlide{number}")
+        return [
+            etree.tostring(
+                element, xml_declaration=True, encoding="UTF-8", standalone=True
+            )
+            for element in (root, rels)
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def deck_template(style_function):
+    """Return the DeckTemplate of a style, building it on first use."""
+    return DeckTemplate(style_function)
+
+
+def write_pptx_from_flashcards(flashcards, file, style="classic"):
+    """
+    Write a flashcard deck to file, a path or a seekable binary file object.
+
+    Every card becomes a front and a back slide rendered from the style's
+    cached template, and each slide is compressed into the zip as soon as it
+    is rendered. Only the zip directory grows with the number of cards, so a
+    deck of thousands of cards needs about as much memory as a small one.
+    """
+    template = deck_template(styles.get(style, style_advanced))
+    slide_count = len(flashcards) * 2
+    presentation_xml, presentation_rels = template.presentation(slide_count)
+    package = {
+        "[Content_Types].xml": template.content_types(slide_count),
+        "ppt/presentation.xml": presentation_xml,
+        "ppt/_rels/presentation.xml.rels": presentation_rels,
+    }
+    scratch = _Paragraph(parse_xml(f"<a:p {nsdecls('a')}/>"), None)
+
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in template.parts.items():
+            archive.writestr(name, package.get(name, content))
+
+        number = 0
+        for card in flashcards:
+            for slide_template, side in (
+                (template.front, "front"),
+                (template.back, "back"),
+            ):
+                number += 1
+                archive.writestr(
+                    f"ppt/slides/slide{number}.xml",
+                    slide_template.render(card.get(side, ""), scratch),
+                )
+                archive.writestr(
+                    f"ppt/slides/_rels/slide{number}.xml.rels",
+                    slide_template.rels_xml,
+                )
+
+
 # Main function to create a presentation with a chosen style
 def create_pptx_from_flashcards(flashcards, style="classic"):
-    # Create a new presentation
-    presentation = Presentation()
-
-    # Get the chosen style function
-    style_function = styles.get(style, style_advanced)
-
-    for card in flashcards:
-        # Add a slide for the 'front' of the card
-        slide = presentation.slides.add_slide(
-            presentation.slide_layouts[6]
-        )  # Blank layout
-        style_function(slide, card.get("front", ""), is_front=True)
-
-        # Add a slide for the 'back' of the card
-        slide = presentation.slides.add_slide(
-            presentation.slide_layouts[6]
-        )  # Blank layout
-        style_function(slide, card.get("back", ""), is_front=False)
-
-    return presentation
+    """Create a flashcard presentation, two slides per card."""
+    buffer = BytesIO()
+    write_pptx_from_flashcards(flashcards, buffer, style)
+    buffer.seek(0)
+    return Presentation(buffer)
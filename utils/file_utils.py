@@ -1,5 +1,27 @@
+import logging
+import os
+import shutil
+import tempfile
+from fnmatch import fnmatch
 from pathlib import Path
 
+logger = logging.getLogger("TextExtractor")
+
+# Size of each read when copying an upload to disk; bounds per-request memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_DIR = "temp"
+
+# Uploads up to this size are extracted from memory without touching disk
+IN_MEMORY_UPLOAD_BYTES = int(os.environ.get("IN_MEMORY_UPLOAD_BYTES", 16 * 1024 * 1024))
+
+# Total size of the uploads of one batch request extracted from memory; the
+# rest are read from where the multipart parser spooled them
+BATCH_IN_MEMORY_UPLOAD_BYTES = int(
+    os.environ.get("BATCH_IN_MEMORY_UPLOAD_BYTES", 64 * 1024 * 1024)
+)
+
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg"]
+
 
 def get_file_extension(file_path):
     """Get the file extension."""
@@ -10,3 +32,77 @@ def validate_file_exists(file_path):
     """Check if the file exists."""
     if not Path(file_path).exists():
         raise FileNotFoundError(f"File not found: {file_path}")
+
+
+def _matches(relative_path, patterns):
+    return any(fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def iter_files(directory, extensions, include=None, exclude=None):
+    """
+    Recursively yield the files under directory with one of the extensions.
+
+    Glob patterns are matched against paths relative to directory, such as
+    ``reports/2024/q1.pdf``. A file must match one of ``include`` (when
+    given) and none of ``exclude``; directories matching ``exclude`` are not
+    descended into. The tree is walked with ``os.scandir`` one directory at
+    a time, so files are yielded as they are found.
+    """
+    root = Path(directory)
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(root / relative_dir) as entries:
+                for entry in entries:
+                    relative_path = (
+                        f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    )
+                    if exclude and _matches(relative_path, exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(relative_path)
+                    elif (
+                        entry.is_file()
+                        and get_file_extension(entry.name) in extensions
+                        and (not include or _matches(relative_path, include))
+                    ):
+                        yield Path(entry.path)
+        except OSError as e:
+            logger.warning(f"Skipping directory {root / relative_dir}: {e}")
+
+
+async def save_upload_file(
+    upload_file, directory=UPLOAD_DIR, chunk_size=UPLOAD_CHUNK_SIZE, filename=None
+):
+    """
+    Stream an uploaded file to disk in fixed-size chunks.
+
+    Each upload gets its own temporary directory so concurrent uploads with
+    the same filename never overwrite each other. The file is saved under
+    ``filename`` when given, otherwise under the upload's own name.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    temp_dir = Path(tempfile.mkdtemp(dir=directory))
+    temp_file_path = temp_dir / Path(filename or upload_file.filename).name
+    try:
+        with open(temp_file_path, "wb") as temp_file:
+            while chunk := await upload_file.read(chunk_size):
+                temp_file.write(chunk)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return temp_file_path
+
+
+async def read_upload_file(upload_file, max_bytes=IN_MEMORY_UPLOAD_BYTES):
+    """Return the content of an upload as bytes, or None if it is larger."""
+    if upload_file.size is None or upload_file.size > max_bytes:
+        return None
+    await upload_file.seek(0)
+    return await upload_file.read()
+
+
+def remove_upload_file(temp_file_path):
+    """Remove a file saved by save_upload_file along with its directory."""
+    shutil.rmtree(Path(temp_file_path).parent, ignore_errors=True)
@@ -6,6 +6,10 @@ def setup_logger():
     logger = logging.getLogger("TextExtractor")
     logger.setLevel(logging.INFO)
 
+    # Every module calls this, so only attach the handler once
+    if logger.handlers:
+        return logger
+
     # Console handler
     ch = logging.StreamHandler()
     ch.setLevel(logging.INFO)
@@ -0,0 +1,149 @@
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from utils.cache import hash_file
+
+MANIFEST_NAME = ".extraction_manifest.sqlite3"
+
+# Rows written between commits, so an interrupted run keeps most of its work
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    options TEXT NOT NULL,
+    output_path TEXT,
+    duration REAL NOT NULL,
+    run_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_run ON files(root, run_id);
+"""
+
+
+class Manifest:
+    """
+    Record of the files a directory run has already extracted.
+
+    Each row holds a file's size, mtime, content hash, extraction options
+    and output location. A file is re-extracted only when it is new, its
+    content changed or the options changed. Rows of files deleted since
+    are pruned along with their output.
+    """
+
+    def __init__(self, manifest_path, root):
+        self.manifest_path = Path(manifest_path)
+        self.root = str(Path(root).resolve())
+        self.run_id = time.time_ns()
+        self.skipped = 0
+        self.saved_seconds = 0.0
+        self._pending = 0
+        self._connection = sqlite3.connect(self.manifest_path)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_current(self, file_path, options):
+        """
+        Return True if file_path was already extracted with these options.
+
+        The size and mtime are compared first; the content is only hashed
+        when they changed, so touched-but-identical files are still skipped.
+        A current file is marked as seen by this run.
+        """
+        path = str(Path(file_path).resolve())
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, content_hash, options, output_path, duration "
+            "FROM files WHERE path = ?",
+            (path,),
+        ).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, content_hash, stored_options, output_path, duration = row
+        if stored_options != options:
+            return False
+        if output_path and not Path(output_path).exists():
+            return False
+
+        stat = Path(path).stat()
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            if hash_file(path) != content_hash:
+                return False
+
+        self._connection.execute(
+            "UPDATE files SET size = ?, mtime_ns = ?, run_id = ? WHERE path = ?",
+            (stat.st_size, stat.st_mtime_ns, self.run_id, path),
+        )
+        self.skipped += 1
+        self.saved_seconds += duration
+        self._written()
+        return True
+
+    def mark_seen(self, file_path):
+        """Keep a file's row through pruning without updating it, e.g. on failure."""
+        self._connection.execute(
+            "UPDATE files SET run_id = ? WHERE path = ?",
+            (self.run_id, str(Path(file_path).resolve())),
+        )
+        self._written()
+
+    def record(self, file_path, options, output_path, duration):
+        """Record a file that was just extracted."""
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files (path, root, size, mtime_ns, "
+            "content_hash, options, output_path, duration, run_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path),
+                self.root,
+                stat.st_size,
+                stat.st_mtime_ns,
+                hash_file(path),
+                options,
+                str(output_path) if output_path else None,
+                duration,
+                self.run_id,
+            ),
+        )
+        self._written()
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._connection.commit()
+            self._pending = 0
+
+    def prune(self):
+        """
+        Forget files under root that no longer exist and delete their output.
+
+        Only rows not seen by this run are checked, and a file that still
+        exists keeps its row and output even when the run skipped it, e.g.
+        because include or exclude patterns left it out.
+        """
+        with closing(self._connection.cursor()) as cursor:
+            rows = cursor.execute(
+                "SELECT path, output_path FROM files WHERE root = ? AND run_id != ?",
+                (self.root, self.run_id),
+            ).fetchall()
+            deleted = [row for row in rows if not Path(row[0]).exists()]
+            for path, output_path in deleted:
+                if output_path:
+                    Path(output_path).unlink(missing_ok=True)
+                cursor.execute("DELETE FROM files WHERE path = ?", (path,))
+        self._connection.commit()
+        return len(deleted)
@@ -0,0 +1,349 @@
+"""
+In-process metrics, exported in the Prometheus text format.
+
+Extractors time their stages with ``stage()``. The timings go to the
+breakdown of the extraction running in the current context, started with
+``collect()``, and travel back with its result, so extractions run in
+worker processes are counted by the API process that serves ``/metrics``.
+Outside ``collect()`` a stage costs one context variable lookup.
+
+Counters served elsewhere, such as the OCR plan and OCR cache counters,
+travel back the same way: inside ``collect_counts()`` they are added to
+the extraction's counts with ``count()``, and the API process hands those
+to the counters registered with ``register_counts()``.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; wide enough for both a text page and a large OCR'd scan
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_breakdown = contextvars.ContextVar("metrics_breakdown", default=None)
+_counts = contextvars.ContextVar("metrics_counts", default=None)
+_metrics = []
+_count_handlers = {}
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = [*zip(labelnames, labels), *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge:
+    """A value that goes up and down, optionally split by labels."""
+
+    kind = "gauge"
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Observed values counted into cumulative buckets, optionally by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: bucket counts (the last one is +Inf), sum, count
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def lines(self):
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._values.items()
+            )
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, [("le", bound)])
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {total}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def collect():
+    """
+    Collect the stage timings of one extraction into a dict.
+
+    Used as ``with collect() as breakdown:``; stages timed in this context
+    add their seconds to ``breakdown``.
+    """
+    breakdown = {}
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+class StageTimer:
+    """Add the time spent in a with block to the breakdown being collected."""
+
+    __slots__ = ("name", "_breakdown", "_started")
+
+    def __init__(self, name):
+        self.name = name
+        self._breakdown = _breakdown.get()
+
+    def __enter__(self):
+        if self._breakdown is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._breakdown is not None:
+            elapsed = time.perf_counter() - self._started
+            self._breakdown[self.name] = self._breakdown.get(self.name, 0.0) + elapsed
+
+
+def stage(name):
+    """Time a stage of the extraction being collected; a no-op otherwise."""
+    return StageTimer(name)
+
+
+def merge(breakdown):
+    """Add a breakdown collected elsewhere, e.g. in a worker, to the current one."""
+    current = _breakdown.get()
+    if current is not None:
+        for name, seconds in breakdown.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+
+@contextmanager
+def collect_counts():
+    """
+    Collect the counters of one extraction into a dict.
+
+    Used as ``with collect_counts() as counts:``; ``count()`` calls in this
+    context add to ``counts``, keyed ``"<group>.<name>"``.
+    """
+    counts = {}
+    token = _counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _counts.reset(token)
+
+
+def collecting_counts():
+    """Return True if counters are being collected for an extraction."""
+    return _counts.get() is not None
+
+
+def count(group, name, amount=1):
+    """Add to a counter of the extraction being collected."""
+    counts = _counts.get()
+    if counts is not None:
+        key = f"{group}.{name}"
+        counts[key] = counts.get(key, 0) + amount
+
+
+def register_counts(group, handler):
+    """Have ``handler(counters)`` add the counters of group to where they are served."""
+    _count_handlers[group] = handler
+
+
+def add_counts(counts):
+    """Hand counts collected in any process to the handlers of their groups."""
+    groups = {}
+    for key, amount in counts.items():
+        group, name = key.split(".", 1)
+        groups.setdefault(group, {})[name] = amount
+    for group, counters in groups.items():
+        handler = _count_handlers.get(group)
+        if handler is not None:
+            handler(counters)
+
+
+def merge_counts(counts):
+    """Add counts collected in a worker to the current ones, or serve them here."""
+    current = _counts.get()
+    if current is None:
+        add_counts(counts)
+        return
+    for key, amount in counts.items():
+        current[key] = current.get(key, 0) + amount
+
+
+EXTRACTIONS = Counter(
+    "extractions_total", "Extractions by format and status code.", ["format", "status"]
+)
+CACHE_HITS = Counter(
+    "extraction_cache_hits_total",
+    "Extractions served from the extraction cache.",
+    ["format"],
+)
+COALESCED = Counter(
+    "extraction_coalesced_total",
+    "Requests that shared the extraction of an identical request in flight.",
+    ["format"],
+)
+EXTRACTION_SECONDS = Histogram(
+    "extraction_duration_seconds",
+    "Time spent extracting a file, excluding cache hits.",
+    ["format"],
+)
+STAGE_SECONDS = Histogram(
+    "extraction_stage_seconds",
+    "Time spent per extraction in each stage.",
+    ["format", "stage"],
+)
+PAGES = Counter("extraction_pages_total", "Pages and slides extracted.", ["format"])
+INPUT_BYTES = Counter(
+    "extraction_input_bytes_total", "Size of the documents extracted.", ["format"]
+)
+OUTPUT_CHARS = Counter(
+    "extraction_output_chars_total", "Characters of text extracted.", ["format"]
+)
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ["path", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time spent answering HTTP requests.", ["path"]
+)
+RESPONSE_BYTES = Counter(
+    "http_response_bytes_total",
+    "Size of HTTP response bodies with a known length.",
+    ["path"],
+)
+
+SCHEDULER_LIMIT = Gauge(
+    "scheduler_concurrency_limit", "Extractions the scheduler lets run at once."
+)
+SCHEDULER_RUNNING = Gauge("scheduler_running_jobs", "Extractions admitted and running.")
+SCHEDULER_WAITING = Gauge(
+    "scheduler_waiting_jobs", "Extractions waiting for the scheduler to admit them."
+)
+SCHEDULER_RESERVED = Gauge(
+    "scheduler_reserved_memory_bytes",
+    "Estimated memory of the extractions running.",
+)
+SCHEDULER_ADJUSTMENTS = Counter(
+    "scheduler_adjustments_total",
+    "Changes of the concurrency limit by direction and cause.",
+    ["direction", "reason"],
+)
+SCHEDULER_WAIT_SECONDS = Histogram(
+    "scheduler_wait_seconds", "Time extractions waited to be admitted."
+)
+LIMIT_KILLS = Counter(
+    "extraction_limit_kills_total",
+    "Extractions stopped for exceeding the per-job memory or time limit.",
+    ["reason"],
+)
+
+
+def observe_extraction(
+    file_format, result, status_code, input_bytes=None, coalesced=False
+):
+    """
+    Count a finished extraction.
+
+    ``result`` is the ExtractionResult, or the error message when
+    ``status_code`` is not 200. Results without a breakdown came from the
+    cache. A ``coalesced`` request shared another request's extraction and
+    is only counted as such, so the work is not counted twice.
+    """
+    if coalesced:
+        COALESCED.inc(1, file_format)
+        return
+    EXTRACTIONS.inc(1, file_format, str(status_code))
+    if input_bytes:
+        INPUT_BYTES.inc(input_bytes, file_format)
+    if status_code != 200:
+        return
+
+    OUTPUT_CHARS.inc(len(result.text), file_format)
+    if result.breakdown is None:
+        CACHE_HITS.inc(1, file_format)
+        return
+
+    EXTRACTION_SECONDS.observe(result.timings.get("total", 0.0), file_format)
+    for name, seconds in result.breakdown.items():
+        STAGE_SECONDS.observe(seconds, file_format, name)
+    pages = sum(
+        result.kinds.count(index)
+        for index, kind in enumerate(result.kind_names)
+        if kind in ("page", "slide")
+    )
+    if pages:
+        PAGES.inc(pages, file_format)
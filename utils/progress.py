@@ -0,0 +1,40 @@
+import time
+
+
+class ProgressReporter:
+    """
+    Periodically print how many files a run has finished and how fast.
+
+    ``update`` is cheap and meant to be called once per file; a line is
+    only printed when ``interval`` seconds have passed since the last one.
+    """
+
+    def __init__(self, interval=10.0, print_fn=print):
+        self.interval = interval
+        self.print_fn = print_fn
+        self.started = time.perf_counter()
+        self.counts = {"processed": 0, "skipped": 0, "failed": 0}
+        self._last_report = self.started
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def update(self, outcome):
+        """Count one finished file; outcome is a key of ``counts``."""
+        self.counts[outcome] += 1
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report(now)
+
+    def elapsed(self, now=None):
+        return (now or time.perf_counter()) - self.started
+
+    def report(self, now=None):
+        elapsed = self.elapsed(now)
+        rate = self.total / elapsed if elapsed else 0.0
+        self.print_fn(
+            f"{self.total} files in {elapsed:.0f}s ({rate:.1f} files/s): "
+            + ", ".join(f"{count} {name}" for name, count in self.counts.items())
+        )
@@ -0,0 +1,82 @@
+"""
+System and process resource readings for the extraction scheduler.
+
+Uses psutil when it is installed and falls back to /proc on Linux. Every
+reading returns None when neither is available, and callers then skip the
+decisions that depend on it.
+"""
+
+import os
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def memory_info():
+    """Return ``(total, available)`` system memory in bytes, or (None, None)."""
+    if psutil is not None:
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+    try:
+        values = {}
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                name, _, value = line.partition(":")
+                values[name] = int(value.split()[0]) * 1024
+        return values["MemTotal"], values["MemAvailable"]
+    except (OSError, KeyError, ValueError, IndexError):
+        return None, None
+
+
+def process_rss(pid=None):
+    """Return the resident memory of a process (default: this one) in bytes."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cpu_times():
+    """Return ``(busy, total)`` CPU jiffies since boot from /proc/stat."""
+    with open("/proc/stat") as stat:
+        fields = [int(value) for value in stat.readline().split()[1:]]
+    # idle and iowait
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return sum(fields) - idle, sum(fields)
+
+
+class CpuSampler:
+    """
+    Report how busy the CPUs were between two calls, from 0 to 1.
+
+    The first call has nothing to compare with and returns None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = None
+
+    def busy(self):
+        if psutil is not None:
+            busy = psutil.cpu_percent(interval=None) / 100
+            with self._lock:
+                first, self._last = self._last is None, True
+            return None if first else busy
+        try:
+            times = _cpu_times()
+        except (OSError, ValueError, IndexError):
+            return None
+        with self._lock:
+            last, self._last = self._last, times
+        if last is None or times[1] == last[1]:
+            return None
+        return (times[0] - last[0]) / (times[1] - last[1])
@@ -0,0 +1,62 @@
+import functools
+import threading
+from concurrent.futures import Future
+
+
+def _copy_outcome(future, done):
+    """Settle future the way done was settled."""
+    if done.cancelled():
+        future.cancel()
+    elif done.exception() is not None:
+        future.set_exception(done.exception())
+    else:
+        future.set_result(done.result())
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the work and gets its future; callers
+    arriving before that future is done get the same future instead of
+    starting the work again. Keys are forgotten as soon as their future is
+    done, so later callers start afresh (and usually hit a cache).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def submit(self, key, start):
+        """
+        Return ``(future, shared)`` for key.
+
+        ``start`` is called without arguments to start the work and must
+        return a concurrent.futures.Future; it is only called when no call
+        for key is in flight, and outside the lock, so it may block.
+        ``shared`` tells whether the future was started by an earlier
+        caller.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future, True
+            future = self._futures[key] = Future()
+        future.add_done_callback(lambda done: self._forget(key, done))
+
+        try:
+            started = start()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        started.add_done_callback(functools.partial(_copy_outcome, future))
+        return future, False
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._futures)